@@ -0,0 +1,197 @@
+"""SLO coverage and student reach, for the Analytics page.
+
+Everything is computed with grouped SQL and then reshaped with whole-column
+pandas operations. Campus, librarian, month and semester figures come from
+the summary tables (which also cover archived semesters); coverage by
+course needs the session/SLO join and reads the working tables plus the
+archive.
+
+Results for a closed semester can only change if someone writes a session
+of a closed semester, so they are cached by semester alone and survive
+other writes; everything else is cached until the next write.
+"""
+import functools
+import pandas as pd
+from sqlalchemy import select, func, false
+from database import engine, InstructionSession, InstructionSessionSLO, SessionSummary, SloSummary
+from cache import cached, cached_stable
+from reports import in_semester
+from semesters import SEMESTER_MONTHS, is_closed
+import archive
+
+COVERAGE_GROUPS = ('campus', 'librarian', 'course')
+TERM_BY_MONTH = {month: term for term, first, last in SEMESTER_MONTHS for month in range(first, last + 1)}
+
+
+def per_semester(func):
+    """Cache func(semester, ...): closed semesters until a write to a closed semester, others until the next write."""
+    stable, live = cached_stable(func), cached(func)
+
+    @functools.wraps(func)
+    def wrapper(semester=None, *args, **kwargs):
+        return (stable if is_closed(semester) else live)(semester, *args, **kwargs)
+
+    wrapper.uncached = func
+    return wrapper
+
+
+def _frame(stmt, columns):
+    with engine.connect() as conn:
+        return pd.DataFrame([tuple(row) for row in conn.execute(stmt)], columns=columns)
+
+
+def _frame_with_archive(stmt, columns):
+    """Rows of stmt from the working tables and, once semesters have been archived, the archive."""
+    frames = [_frame(stmt, columns)]
+    archived = archive.archive_engine()
+    if archived is not None:
+        with archived.connect() as conn:
+            frames.append(pd.DataFrame([tuple(row) for row in conn.execute(stmt)], columns=columns))
+    return pd.concat(frames, ignore_index=True)
+
+
+def _semester_names(months):
+    """'YYYY-MM' strings -> semester names, e.g. '2025-09' -> 'Fall 2025'."""
+    months = months.astype(str)  # an empty result has no string dtype yet
+    terms = months.str.slice(5, 7).astype(int).map(TERM_BY_MONTH).astype(str)
+    return terms + ' ' + months.str.slice(0, 4)
+
+
+# --- SLO COVERAGE ---
+
+def _coverage_from_summaries(group, semester):
+    label = group.title()
+    slo_total = func.sum(SloSummary.sessions)
+    slo_column = getattr(SloSummary, group)
+    slo_counts = _frame(
+        select(slo_column, SloSummary.slo, slo_total)
+        .where(slo_column != '', in_semester(semester, SloSummary.semester))
+        .group_by(slo_column, SloSummary.slo)
+        .having(slo_total > 0),
+        [label, 'SLO', 'count'],
+    )
+    session_total = func.sum(SessionSummary.sessions)
+    session_column = getattr(SessionSummary, group)
+    sessions = _frame(
+        select(session_column, session_total)
+        .where(session_column != '', in_semester(semester))
+        .group_by(session_column)
+        .having(session_total > 0),
+        [label, 'Sessions'],
+    )
+    return label, slo_counts, sessions
+
+
+def _coverage_by_course(semester):
+    active = [InstructionSession.canceled == false(), InstructionSession.course_code.is_not(None)]
+    if semester:
+        active.append(InstructionSession.semester == semester)
+    code, number = InstructionSession.course_code, InstructionSession.course_number
+    slo_counts = _frame_with_archive(
+        select(code, number, InstructionSessionSLO.slo, func.count())
+        .join(InstructionSessionSLO, InstructionSessionSLO.session_id == InstructionSession.id)
+        .where(*active, InstructionSessionSLO.slo.is_not(None))
+        .group_by(code, number, InstructionSessionSLO.slo),
+        ['code', 'number', 'SLO', 'count'],
+    )
+    sessions = _frame_with_archive(
+        select(code, number, func.count()).where(*active).group_by(code, number),
+        ['code', 'number', 'Sessions'],
+    )
+    # Codes are typed by hand ('engl', 'ENGL '), so normalize before regrouping
+    for frame in (slo_counts, sessions):
+        frame['Course'] = frame['code'].str.strip().str.upper() + ' ' + frame['number'].fillna('').str.strip()
+    slo_counts = slo_counts.groupby(['Course', 'SLO'], as_index=False)['count'].sum()
+    sessions = sessions.groupby('Course', as_index=False)['Sessions'].sum()
+    return 'Course', slo_counts, sessions
+
+
+@per_semester
+def slo_coverage(semester=None, group='campus'):
+    """Non-canceled sessions per campus, librarian or course, and how many addressed each SLO.
+
+    One row per group with a Sessions column followed by a column per SLO.
+    """
+    if group not in COVERAGE_GROUPS:
+        raise ValueError(f"Unknown coverage group: {group}")
+    if group == 'course':
+        label, slo_counts, sessions = _coverage_by_course(semester)
+    else:
+        label, slo_counts, sessions = _coverage_from_summaries(group, semester)
+    if sessions.empty:
+        return pd.DataFrame(columns=[label, 'Sessions'])
+
+    by_slo = slo_counts.pivot_table(index=label, columns='SLO', values='count', aggfunc='sum', fill_value=0)
+    by_slo.columns.name = None
+    coverage = sessions.set_index(label).join(by_slo, how='left').fillna(0)
+    coverage = coverage.astype(int).sort_values('Sessions', ascending=False)
+    return coverage.reset_index()
+
+
+def coverage_shares(coverage):
+    """slo_coverage() with each SLO count turned into a share of the row's sessions."""
+    shares = coverage.copy()
+    slo_columns = shares.columns[2:]
+    shares[slo_columns] = shares[slo_columns].div(shares['Sessions'], axis=0)
+    return shares
+
+
+# --- STUDENT REACH ---
+
+@per_semester
+def students_by_month(semester=None):
+    """Sessions and students reached per month, in calendar order."""
+    sessions, students = func.sum(SessionSummary.sessions), func.sum(SessionSummary.students)
+    frame = _frame(
+        select(SessionSummary.month, sessions, students)
+        .where(SessionSummary.month != '', in_semester(semester))
+        .group_by(SessionSummary.month)
+        .having(sessions > 0)
+        .order_by(SessionSummary.month),
+        ['Month', 'Sessions', 'Students'],
+    )
+    frame.insert(1, 'Semester', _semester_names(frame['Month']))
+    frame['Students per Session'] = (frame['Students'] / frame['Sessions']).round(1)
+    return frame
+
+
+@cached
+def students_by_semester():
+    """Sessions and students reached per semester, oldest first."""
+    months = students_by_month.uncached()
+    frame = months.groupby('Semester', as_index=False, sort=False)[['Sessions', 'Students']].sum()
+    frame['Students per Session'] = (frame['Students'] / frame['Sessions']).round(1)
+    return frame  # months arrive in calendar order, so the semesters do too
+
+
+@cached
+def year_over_year(period='semester'):
+    """Each semester (or month) next to the same one a year earlier, with the change in percent."""
+    if period == 'semester':
+        frame, label = students_by_semester.uncached(), 'Semester'
+    elif period == 'month':
+        frame, label = students_by_month.uncached(), 'Month'
+    else:
+        raise ValueError(f"Unknown period: {period}")
+    columns = [
+        label, 'Sessions', 'Sessions Last Year', 'Sessions Change %',
+        'Students', 'Students Last Year', 'Students Change %',
+    ]
+    if frame.empty:
+        return pd.DataFrame(columns=columns)
+
+    if period == 'semester':
+        frame[['Term', 'Year']] = frame[label].str.rsplit(' ', n=1, expand=True)
+    else:
+        frame['Term'], frame['Year'] = frame[label].str.slice(5, 7), frame[label].str.slice(0, 4)
+    frame['Year'] = frame['Year'].astype(int)
+
+    previous = frame[['Term', 'Year', 'Sessions', 'Students']].rename(
+        columns={'Sessions': 'Sessions Last Year', 'Students': 'Students Last Year'}
+    )
+    previous['Year'] += 1
+    compared = frame.merge(previous, on=['Term', 'Year'], how='left')
+    for column in ('Sessions', 'Students'):
+        last_year = compared[f'{column} Last Year']
+        compared[f'{column} Change %'] = ((compared[column] - last_year) / last_year * 100).round(1)
+    return compared[columns]
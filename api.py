@@ -0,0 +1,222 @@
+"""Read-only JSON API over sessions and the dashboard statistics.
+
+Runs alongside the Streamlit app for other campus systems to poll::
+
+    python api.py --port 8000
+    uvicorn api:app --port 8000
+
+Endpoints:
+
+- ``GET /sessions`` – sessions in id order, filtered like the sessions page
+  (``status``, ``campus``, ``librarian``, ``semester``, ``start_date``,
+  ``end_date``, ``q``). Pages are keyset based: pass the response's
+  ``next_after`` back as ``after`` to get the next page.
+- ``GET /sessions/{id}`` – one session.
+- ``GET /stats`` – the dashboard rollups.
+
+Responses are kept in an in-process cache for ``ACC_IL_API_CACHE_TTL``
+seconds (default 30), so frequent polls do not reach the database. Every
+response carries an ETag; a request with a matching ``If-None-Match`` gets
+an empty 304.
+
+FastAPI and uvicorn are optional and only needed to run the API.
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import date
+from sqlalchemy import select
+from database import engine, init_db, InstructionSession, InstructionSessionSLO
+from session_store import STATUSES, status_clause, filter_clauses
+from exports import session_columns
+
+CACHE_TTL_SECONDS = int(os.environ.get("ACC_IL_API_CACHE_TTL", "30"))
+CACHE_MAX_ENTRIES = 512
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+class TTLCache:
+    """Thread-safe dict whose entries expire after ttl seconds; the oldest are dropped when full."""
+
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                return None
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                now = time.monotonic()
+                self._entries = {k: entry for k, entry in self._entries.items() if entry[0] >= now}
+                while len(self._entries) >= self.max_entries:
+                    # dicts keep insertion order, so the first entry is the oldest
+                    del self._entries[next(iter(self._entries))]
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_cache = TTLCache(CACHE_TTL_SECONDS, CACHE_MAX_ENTRIES)
+
+
+def _body(payload):
+    """Serialize a payload to JSON bytes and its ETag (a hash of the bytes)."""
+    body = json.dumps(payload, default=str, separators=(",", ":")).encode()
+    return body, f'"{hashlib.sha1(body).hexdigest()}"'
+
+
+def cached_body(key, build):
+    """(body, etag) for key, built with build() at most once per TTL."""
+    entry = _cache.get(key)
+    if entry is None:
+        entry = _body(build())
+        _cache.set(key, entry)
+    return entry
+
+
+# --- QUERIES ---
+
+def _with_slos(conn, rows):
+    """Session rows as dicts, each with the list of its SLOs."""
+    sessions = [dict(row._mapping, slos=[]) for row in rows]
+    if sessions:
+        by_id = {session['id']: session for session in sessions}
+        slo_stmt = (
+            select(InstructionSessionSLO.session_id, InstructionSessionSLO.slo)
+            .where(InstructionSessionSLO.session_id.in_(list(by_id)))
+            .order_by(InstructionSessionSLO.session_id, InstructionSessionSLO.id)
+        )
+        for session_id, slo in conn.execute(slo_stmt):
+            by_id[session_id]['slos'].append(slo)
+    return sessions
+
+
+def list_sessions(status=None, after=0, limit=PAGE_SIZE, **filters):
+    """One keyset page of sessions with id > after, and the id to continue after (None on the last page)."""
+    stmt = (
+        select(*session_columns)
+        .where(InstructionSession.id > after, *filter_clauses(**filters))
+        .order_by(InstructionSession.id)
+        .limit(limit + 1)
+    )
+    if status:
+        stmt = stmt.where(status_clause(status))
+    with engine.connect() as conn:
+        rows = conn.execute(stmt).all()
+        has_more = len(rows) > limit
+        sessions = _with_slos(conn, rows[:limit])
+    return {
+        "sessions": sessions,
+        "next_after": sessions[-1]['id'] if has_more else None,
+    }
+
+
+def get_session(session_id):
+    stmt = select(*session_columns).where(InstructionSession.id == session_id)
+    with engine.connect() as conn:
+        sessions = _with_slos(conn, conn.execute(stmt).all())
+    return sessions[0] if sessions else None
+
+
+def statistics():
+    """The dashboard rollups as JSON-ready lists of records."""
+    import reports
+
+    def records(frame):
+        return json.loads(frame.to_json(orient="records"))
+
+    return {
+        "canceled": int(reports.canceled_count.uncached()),
+        "by_campus": records(reports.sessions_by_campus.uncached()),
+        "by_librarian": records(reports.sessions_by_librarian.uncached()),
+        "by_librarian_type": records(reports.librarian_type_breakdown.uncached()),
+        "by_month": records(reports.sessions_by_month.uncached()),
+        "slos": records(reports.slo_frequency.uncached()),
+    }
+
+
+# --- APP ---
+
+def create_app():
+    """Prepare the database and build the FastAPI application (FastAPI is optional)."""
+    from fastapi import FastAPI, HTTPException, Query, Request, Response
+
+    init_db()
+    api = FastAPI(title="ACC Library Instruction API")
+
+    def respond(request, body, etag):
+        headers = {"ETag": etag, "Cache-Control": f"max-age={CACHE_TTL_SECONDS}"}
+        if etag in request.headers.get("if-none-match", ""):
+            return Response(status_code=304, headers=headers)
+        return Response(body, media_type="application/json", headers=headers)
+
+    @api.get("/sessions")
+    def sessions(
+        request: Request,
+        status: str | None = Query(None, enum=list(STATUSES)),
+        campus: str | None = None,
+        librarian: str | None = None,
+        semester: str | None = None,
+        start_date: date | None = None,
+        end_date: date | None = None,
+        q: str | None = None,
+        after: int = Query(0, ge=0),
+        limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    ):
+        filters = dict(campus=campus, librarian=librarian, semester=semester,
+                       start_date=start_date, end_date=end_date, query=q)
+        key = ("sessions", status, after, limit, tuple(sorted(filters.items())))
+        try:
+            return respond(request, *cached_body(key, lambda: list_sessions(status, after, limit, **filters)))
+        except ValueError as error:
+            # e.g. an unknown semester name
+            raise HTTPException(status_code=400, detail=str(error))
+
+    @api.get("/sessions/{session_id}")
+    def session(request: Request, session_id: int):
+        body, etag = cached_body(("session", session_id), lambda: get_session(session_id))
+        if body == b"null":
+            raise HTTPException(status_code=404, detail="Session not found")
+        return respond(request, body, etag)
+
+    @api.get("/stats")
+    def stats(request: Request):
+        return respond(request, *cached_body(("stats",), statistics))
+
+    return api
+
+
+def __getattr__(name):
+    # `uvicorn api:app` builds the app on first access, so importing this
+    # module for its query functions does not need FastAPI
+    if name == "app":
+        return create_app()
+    raise AttributeError(name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    import uvicorn
+    uvicorn.run(create_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
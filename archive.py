@@ -0,0 +1,242 @@
+"""Move closed semesters out of the working tables into an archive database.
+
+Sessions of closed semesters (and their SLOs) are moved to a second SQLite
+file with the same schema, so the pages, filters and search index only
+cover recent semesters. The dashboard rollups keep counting archived
+sessions, and exports can read the archive for historical reports::
+
+    python archive.py status                      # sessions per semester, working vs archived
+    python archive.py move                        # archive all but the last KEEP_SEMESTERS semesters
+    python archive.py move --semester "Fall 2022"  # closed semesters only, unless --force
+    python archive.py restore "Fall 2022"
+
+The archive defaults to acc_library_il_archive.db next to the main database
+(ACC_IL_ARCHIVE_URL overrides it). Archiving is only implemented for SQLite.
+Session ids are never reused (AUTOINCREMENT, migration 7), so a session
+keeps its id in both databases; a move that would overwrite another session
+with the same id is refused.
+"""
+import argparse
+import os
+from sqlalchemy import select, func, text, bindparam, make_url
+from database import engine, create_db_engine, init_db, DATABASE_URL, Base, InstructionSession, InstructionSessionSLO
+from semesters import semester_bounds, session_semester, recent_semesters, is_closed
+import changes
+
+# The current semester and the ones before it that stay in the working tables
+KEEP_SEMESTERS = 6
+ARCHIVED_TABLES = [InstructionSession.__table__, InstructionSessionSLO.__table__]
+
+
+def _default_url():
+    url = make_url(DATABASE_URL)
+    if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+        return None
+    stem, extension = os.path.splitext(url.database)
+    return url.set(database=f"{stem}_archive{extension or '.db'}").render_as_string(hide_password=False)
+
+
+ARCHIVE_URL = os.environ.get("ACC_IL_ARCHIVE_URL") or _default_url()
+_engines = {}
+
+
+def _archive_path():
+    if engine.dialect.name != "sqlite" or not ARCHIVE_URL:
+        raise RuntimeError("Archiving is only implemented for SQLite")
+    return make_url(ARCHIVE_URL).database
+
+
+def archive_engine(create=False):
+    """Engine for the archive database, or None if nothing has been archived yet (unless create)."""
+    if not ARCHIVE_URL or engine.dialect.name != "sqlite":
+        return None
+    if not create and not os.path.exists(_archive_path()):
+        return None
+    if ARCHIVE_URL not in _engines:
+        archive = create_db_engine(ARCHIVE_URL)
+        Base.metadata.create_all(archive, tables=ARCHIVED_TABLES)
+        _engines[ARCHIVE_URL] = archive
+    return _engines[ARCHIVE_URL]
+
+
+# --- SEMESTERS ---
+
+def backfill_semesters(conn):
+    """Set every session's semester from its dates (see semesters.session_semester)."""
+    table = InstructionSession.__table__
+    rows = conn.execute(select(table.c.id, table.c.date_of_session, table.c.date_1, table.c.semester)).all()
+    updates = []
+    for row in rows:
+        derived = session_semester(row.date_of_session, row.date_1)
+        if derived != row.semester:
+            updates.append({'session_id': row.id, 'derived': derived})
+    if updates:
+        conn.execute(
+            table.update().where(table.c.id == bindparam('session_id')).values(semester=bindparam('derived')),
+            updates,
+        )
+    return len(updates)
+
+
+def closed_semesters(keep=KEEP_SEMESTERS, today=None):
+    """Semesters in the working tables that ended before the last `keep` semesters (current included)."""
+    oldest_kept = recent_semesters(keep + 1, today)[-1]  # the list starts with next semester
+    cutoff, _ = semester_bounds(oldest_kept)
+    with engine.connect() as conn:
+        names = conn.execute(select(InstructionSession.semester).distinct()).scalars().all()
+    return sorted(
+        (name for name in names if name and semester_bounds(name)[1] < cutoff),
+        key=lambda name: semester_bounds(name)[0],
+    )
+
+
+# --- MOVING ROWS ---
+
+class IdCollisionError(Exception):
+    """Sessions being moved share their id with a different session in the other database; nothing was moved."""
+
+    def __init__(self, session_ids):
+        self.session_ids = sorted(session_ids)
+        super().__init__(f"Session ids already used by other sessions: {', '.join(map(str, self.session_ids))}")
+
+
+def _columns(table):
+    return ", ".join(f'"{column.name}"' for column in table.columns)
+
+
+def _transfer(semesters, source, target, action):
+    """Move the semesters' sessions and their SLOs from source to target in one transaction.
+
+    source/target are 'main' or 'archive'. A session whose id is taken by a
+    different session in target raises IdCollisionError before anything is
+    written. An identical copy already in target (left behind by an
+    interrupted move; SQLite does not commit attached WAL databases
+    atomically) is kept and only removed from source. SLO rows get new ids
+    in target.
+    """
+    sessions, slos = (f'"{table.name}"' for table in ARCHIVED_TABLES)
+    session_table, slo_table = ARCHIVED_TABLES
+    session_columns = _columns(session_table)
+    slo_columns = ", ".join(f'"{column.name}"' for column in slo_table.columns if column.name != 'id')
+    semester_list = ", ".join(f":semester_{i}" for i in range(len(semesters)))
+    params = {f"semester_{i}": semester for i, semester in enumerate(semesters)}
+    same_row = " AND ".join(f's."{column.name}" IS t."{column.name}"' for column in session_table.columns)
+    moving = "SELECT id FROM temp.moving"
+
+    archive_engine(create=True)
+    with engine.connect() as conn:
+        conn.exec_driver_sql("ATTACH DATABASE ? AS archive", (_archive_path(),))
+        conn.exec_driver_sql("CREATE TEMP TABLE IF NOT EXISTS moving (id INTEGER PRIMARY KEY)")
+        conn.commit()  # ATTACH cannot run inside the transaction below
+        try:
+            with conn.begin():
+                conn.execute(text("DELETE FROM temp.moving"))
+                conn.execute(text(
+                    f"INSERT INTO temp.moving SELECT id FROM {source}.{sessions} WHERE semester IN ({semester_list})"
+                ), params)
+                shared = conn.execute(text(
+                    f"SELECT s.id, {same_row} FROM {source}.{sessions} s JOIN {target}.{sessions} t ON t.id = s.id "
+                    f"WHERE s.id IN ({moving})"
+                )).all()
+                collisions = [session_id for session_id, same in shared if not same]
+                if collisions:
+                    raise IdCollisionError(collisions)
+
+                # SLOs of leftover copies are replaced along with everyone else's
+                conn.execute(text(f"DELETE FROM {target}.{slos} WHERE session_id IN ({moving})"))
+                conn.execute(text(
+                    f"INSERT INTO {target}.{sessions} ({session_columns}) SELECT {session_columns} "
+                    f"FROM {source}.{sessions} WHERE id IN ({moving}) AND id NOT IN (SELECT id FROM {target}.{sessions})"
+                ))
+                conn.execute(text(
+                    f"INSERT INTO {target}.{slos} ({slo_columns}) SELECT {slo_columns} "
+                    f"FROM {source}.{slos} WHERE session_id IN ({moving})"
+                ))
+
+                session_ids = conn.execute(text(moving)).scalars().all()
+                # Open pages drop archived sessions / pick up restored ones through the change feed
+                changes.record(conn, session_ids, action)
+                conn.execute(text(f"DELETE FROM {source}.{slos} WHERE session_id IN ({moving})"))
+                conn.execute(text(f"DELETE FROM {source}.{sessions} WHERE id IN ({moving})"))
+        finally:
+            conn.exec_driver_sql("DROP TABLE IF EXISTS temp.moving")
+            conn.exec_driver_sql("DETACH DATABASE archive")
+            conn.commit()
+    return len(session_ids)
+
+
+def move(semesters, force=False):
+    """Archive the sessions of these semesters. Returns the number of sessions moved.
+
+    Raises ValueError for a semester that has not ended yet (its open
+    requests would vanish from the sessions page) unless force is set.
+    """
+    if not semesters:
+        return 0
+    still_open = [semester for semester in semesters if not is_closed(semester)]
+    if still_open and not force:
+        raise ValueError(f"Not closed yet: {', '.join(still_open)}")
+    return _transfer(semesters, 'main', 'archive', 'archive')
+
+
+def restore(semesters):
+    """Move archived semesters back into the working tables. Returns the number of sessions restored."""
+    if not semesters or archive_engine() is None:
+        return 0
+    return _transfer(semesters, 'archive', 'main', 'restore')
+
+
+def semester_counts():
+    """{semester: (working sessions, archived sessions)}."""
+    stmt = select(InstructionSession.semester, func.count()).group_by(InstructionSession.semester)
+    counts = {}
+    with engine.connect() as conn:
+        for semester, count in conn.execute(stmt):
+            counts[semester] = (count, 0)
+    archive = archive_engine()
+    if archive is not None:
+        with archive.connect() as conn:
+            for semester, count in conn.execute(stmt):
+                counts[semester] = (counts.get(semester, (0, 0))[0], count)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("status")
+    move_parser = subparsers.add_parser("move")
+    move_parser.add_argument("--keep", type=int, default=KEEP_SEMESTERS,
+                             help="recent semesters to keep, the current one included")
+    move_parser.add_argument("--semester", action="append", help="archive just this semester (repeatable)")
+    move_parser.add_argument("--dry-run", action="store_true")
+    move_parser.add_argument("--force", action="store_true", help="also archive semesters that have not ended")
+    restore_parser = subparsers.add_parser("restore")
+    restore_parser.add_argument("semester", nargs="+")
+    args = parser.parse_args()
+    init_db()
+
+    if args.command == "status":
+        counts = semester_counts()
+        named = sorted((name for name in counts if name), key=lambda name: semester_bounds(name)[0])
+        for name in named + ([None] if None in counts else []):
+            working, archived = counts[name]
+            print(f"{name or '(no dates)':15}  {working:>8} working  {archived:>8} archived")
+    elif args.command == "move":
+        semesters = args.semester or closed_semesters(args.keep)
+        if args.dry_run or not semesters:
+            print(f"Would archive: {', '.join(semesters)}" if semesters else "Nothing to archive.")
+            return
+        try:
+            print(f"Archived {move(semesters, force=args.force)} sessions from {', '.join(semesters)}.")
+        except (ValueError, IdCollisionError) as exc:
+            parser.exit(1, f"Nothing archived. {exc}\n")
+    else:
+        try:
+            print(f"Restored {restore(args.semester)} sessions.")
+        except IdCollisionError as exc:
+            parser.exit(1, f"Nothing restored. {exc}\n")
+
+
+if __name__ == "__main__":
+    main()
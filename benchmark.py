@@ -0,0 +1,385 @@
+"""Headless performance benchmarks for the app.
+
+Pages are run through Streamlit's AppTest, so no browser is needed, and
+results are written as JSON::
+
+    python benchmark.py startup --output startup.json
+    python benchmark.py suite --sizes 10000 100000 1000000 --output suite.json
+    python benchmark.py suite --sizes 10000 --baseline suite.json
+
+``startup`` must run in a fresh process: it times the cold start (importing
+Streamlit, preparing the database and rendering the home page), the first
+open of each page and the median rerun of each page against the
+configured database, and exits non-zero when a time is over its budget.
+
+``suite`` builds a throwaway SQLite database of synthetic sessions for each
+size (in a separate process, since the engine is created on import) and
+times the page loads plus the key reads and writes. With --baseline it
+exits non-zero when any timing got more than REGRESSION_RATIO slower.
+``generate`` and ``measure`` write synthetic sessions, so they refuse to run
+against a database that holds any other sessions.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, time as clock_time, timedelta
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+MAIN_SCRIPT = os.path.join(HERE, "main.py")
+PAGES = ["dashboard.py", "ilform.py", "sessions.py", "bulk_import.py", "insights.py"]
+RERUNS = 5
+REPEATS = 5
+APP_TIMEOUT_SECONDS = 120
+SIZES = [10000, 100000]
+REGRESSION_RATIO = 1.25
+REGRESSION_MIN_SECONDS = 0.02  # ignore slowdowns smaller than timer noise
+
+# Budgets in seconds
+COLD_START_BUDGET = 2.0
+FIRST_OPEN_BUDGET = 1.5
+RERUN_BUDGET = 0.25
+
+# --- SYNTHETIC DATA ---
+
+# Same choices as the request form
+SESSION_TYPES = ['In-Person', 'Asynchronous', 'Synchronous']
+SLO_OPTIONS = [
+    "Develop a research process",
+    "Demonstrate effective search strategies",
+    "Evaluate Information",
+    "Develop an argument supported by evidence",
+    "Use information ethically and legally",
+]
+COURSES = [('ENGL', '1301'), ('ENGL', '1302'), ('GOVT', '2305'), ('HIST', '1301'), ('PSYC', '2301'), ('BIOL', '1406')]
+SESSION_LENGTHS = ['50', '75', '90 min', '1.5 hours']
+YEARS_OF_HISTORY = 6
+CONFIRMED_SHARE, CANCELED_SHARE = 0.85, 0.05  # the rest are open requests
+SYNTHETIC_LAST_NAME = "Synthetic"  # marks every generated session
+GENERATE_CHUNK = 5000
+
+
+def synthetic_rows(count, seed=0, today=None):
+    """Yield (session values, SLO list) pairs spread over every campus and the librarians covering it."""
+    from references import lookups, with_reference_ids
+    from semesters import semester_for
+
+    rng = random.Random(seed)
+    data = lookups()
+    campuses = data.active_campuses
+    today = today or date.today()
+    first_day = today - timedelta(days=365 * YEARS_OF_HISTORY)
+    span = (today - first_day).days
+
+    for _ in range(count):
+        campus = rng.choice(campuses)
+        librarians = data.campus_librarians.get(campus) or data.active_librarians
+        session_type = rng.choices(SESSION_TYPES, weights=[6, 2, 2])[0]
+        course_code, course_number = rng.choice(COURSES)
+        date_1 = first_day + timedelta(days=rng.randrange(span))
+        date_2 = date_1 + timedelta(days=rng.randint(1, 7))
+
+        roll = rng.random()
+        confirmed = roll < CONFIRMED_SHARE + CANCELED_SHARE
+        date_of_session = rng.choice([date_1, date_2]) if confirmed else None
+        values = {
+            'date_1': date_1,
+            'date_2': date_2,
+            'date_of_session': date_of_session,
+            'semester': semester_for(date_of_session or date_1),
+            'campus': campus if session_type == 'In-Person' else None,
+            'librarian_presenter': rng.choice(librarians),
+            'first': f"Instructor{rng.randrange(2000)}",
+            'last': SYNTHETIC_LAST_NAME,
+            'email': None,
+            'course_code': course_code,
+            'course_number': course_number,
+            'type': session_type,
+            'time': clock_time(rng.randint(8, 19), rng.choice([0, 30])) if confirmed else None,
+            'length': rng.choice(SESSION_LENGTHS),
+            'number_of_students': rng.randint(8, 35) if confirmed else None,
+            'canceled': roll >= CONFIRMED_SHARE and confirmed,
+            'canceled_reason': "Synthetic cancellation" if roll >= CONFIRMED_SHARE and confirmed else None,
+        }
+        slos = rng.sample(SLO_OPTIONS, rng.randint(1, 3))
+        yield with_reference_ids(values, data), slos
+
+
+def require_throwaway():
+    """Exit unless the configured database is new or holds only synthetic sessions."""
+    from sqlalchemy import select, func, or_
+    from database import engine, init_db, InstructionSession
+
+    init_db()
+    last = InstructionSession.last
+    stmt = select(func.count()).where(or_(last.is_(None), last != SYNTHETIC_LAST_NAME))
+    with engine.connect() as conn:
+        real = conn.execute(stmt).scalar_one()
+    if real:
+        sys.exit(
+            f"{engine.url} holds {real} sessions that are not synthetic; "
+            "point ACC_IL_DATABASE_URL at a throwaway database."
+        )
+
+
+def generate(count, seed=0):
+    """Insert count synthetic sessions into the configured database. Returns the seconds taken."""
+    from database import engine
+    from importer import insert_sessions
+    from cache import bump_data_version
+
+    started = time.perf_counter()
+    chunk = []
+    for row in synthetic_rows(count, seed):
+        chunk.append(row)
+        if len(chunk) == GENERATE_CHUNK:
+            with engine.begin() as conn:
+                insert_sessions(conn, chunk)
+            chunk = []
+    if chunk:
+        with engine.begin() as conn:
+            insert_sessions(conn, chunk)
+    bump_data_version()
+    return time.perf_counter() - started
+
+
+# --- TIMING ---
+
+def _run(at):
+    started = time.perf_counter()
+    at.run(timeout=APP_TIMEOUT_SECONDS)
+    elapsed = time.perf_counter() - started
+    if at.exception:
+        raise RuntimeError(f"{at.exception[0].value}")
+    return elapsed
+
+
+def startup(pages=PAGES, reruns=RERUNS):
+    """Cold start, first open and rerun times for the multipage app."""
+    started = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    import_seconds = time.perf_counter() - started
+
+    at = AppTest.from_file(MAIN_SCRIPT, default_timeout=APP_TIMEOUT_SECONDS)
+    _run(at)
+    results = {
+        "cold_start": {
+            "seconds": time.perf_counter() - started,
+            "streamlit_import_seconds": import_seconds,
+            "budget": COLD_START_BUDGET,
+        },
+        "pages": {},
+    }
+
+    for page in pages:
+        at.switch_page(page)
+        first_open = _run(at)
+        rerun_times = [_run(at) for _ in range(reruns)]
+        results["pages"][page] = {
+            "first_open_seconds": first_open,
+            "first_open_budget": FIRST_OPEN_BUDGET,
+            "rerun_median_seconds": statistics.median(rerun_times),
+            "rerun_max_seconds": max(rerun_times),
+            "rerun_budget": RERUN_BUDGET,
+        }
+    return results
+
+
+def over_budget(results):
+    """Descriptions of every measurement that exceeded its budget."""
+    failures = []
+    cold = results["cold_start"]
+    if cold["seconds"] > cold["budget"]:
+        failures.append(f"cold start {cold['seconds']:.2f}s > {cold['budget']}s")
+    for page, timing in results["pages"].items():
+        if timing["first_open_seconds"] > timing["first_open_budget"]:
+            failures.append(f"{page} first open {timing['first_open_seconds']:.2f}s > {timing['first_open_budget']}s")
+        if timing["rerun_median_seconds"] > timing["rerun_budget"]:
+            failures.append(f"{page} rerun {timing['rerun_median_seconds']:.2f}s > {timing['rerun_budget']}s")
+    return failures
+
+
+def _time(func, repeats=REPEATS):
+    times = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - started)
+    return {"median_seconds": statistics.median(times), "max_seconds": max(times)}
+
+
+def operations(repeats=REPEATS, seed=0):
+    """Median and max seconds for the reads and writes behind each page.
+
+    Reads call the functions' .uncached versions so the database work is
+    measured rather than a cache hit. Writes add and cancel real sessions.
+    """
+    import analytics
+    import changes
+    import reports
+    import session_store
+    from references import lookups
+    from semesters import recent_semesters, current_semester
+
+    rng = random.Random(seed)
+    data = lookups()
+    results = {}
+    # The sessions page opens each section on its first page of the current semester
+    for status in session_store.STATUSES:
+        def first_page(status=status):
+            session_store.count_sessions.uncached(status, semester=current_semester())
+            session_store.sessions_page.uncached(status, semester=current_semester())
+        results[f"sessions_page.{status}"] = _time(first_page, repeats)
+    for name in ("confirmed_sessions", "canceled_sessions", "canceled_count", "sessions_by_campus",
+                 "sessions_by_librarian", "librarian_type_breakdown", "sessions_by_month", "slo_frequency"):
+        results[f"reports.{name}"] = _time(getattr(reports, name).uncached, repeats)
+    results["reports.listed_count"] = _time(lambda: reports.listed_count.uncached(False), repeats)
+    for group in analytics.COVERAGE_GROUPS:
+        results[f"analytics.slo_coverage.{group}"] = _time(
+            lambda group=group: analytics.slo_coverage.uncached(group=group), repeats
+        )
+    for name in ("students_by_month", "students_by_semester", "year_over_year"):
+        results[f"analytics.{name}"] = _time(getattr(analytics, name).uncached, repeats)
+
+    filters = {
+        "none": {},
+        "campus": {"campus": rng.choice(data.active_campuses)},
+        "librarian": {"librarian": rng.choice(data.active_librarians)},
+        "semester": {"semester": recent_semesters()[2]},
+        "date_range": {"start_date": date.today() - timedelta(days=90), "end_date": date.today()},
+    }
+    for label, values in filters.items():
+        def filtered(values=values):
+            session_store.count_sessions.uncached("confirmed", **values)
+            session_store.sessions_page.uncached("confirmed", **values)
+        results[f"filter.{label}"] = _time(filtered, repeats)
+
+    # Held like the sessions page holds them, then refreshed after the writes below
+    seq = changes.latest_seq()
+    held_pages = {status: session_store.sessions_page.uncached(status) for status in session_store.STATUSES}
+
+    new_ids = []
+    form_rows = synthetic_rows(repeats, seed + 1)
+
+    def insert_request():
+        values, slos = next(form_rows)
+        fields = {key: values[key] for key in (
+            "date_1", "date_2", "first", "last", "email", "campus", "librarian_presenter",
+            "course_code", "course_number", "type",
+        )}
+        # No notification: the app's outbox worker would email the campus addresses
+        new_ids.append(session_store.create_request(slos, **fields))
+    results["create_request"] = _time(insert_request, repeats)
+
+    cancel_ids = iter(new_ids)
+    results["cancel_session"] = _time(lambda: session_store.cancel_session(next(cancel_ids)), repeats)
+
+    for status, frame in held_pages.items():
+        results[f"refresh_page.{status}"] = _time(
+            lambda status=status, frame=frame: session_store.refresh_page(frame, seq, status), repeats
+        )
+    return results
+
+
+def measure(reruns=RERUNS, repeats=REPEATS):
+    """Page timings (from a cold start) followed by operation timings, against the configured database."""
+    results = startup(reruns=reruns)
+    results["over_budget"] = over_budget(results)
+    results["operations"] = operations(repeats)
+    return results
+
+
+def _subprocess(database_url, *args):
+    # The outbox worker started by main.py must never reach the real mail server
+    env = dict(os.environ, ACC_IL_DATABASE_URL=database_url, ACC_IL_SMTP_SERVER="smtp.invalid")
+    subprocess.run([sys.executable, os.path.abspath(__file__), *args], env=env, check=True, cwd=HERE)
+
+
+def suite(sizes=SIZES, reruns=RERUNS, repeats=REPEATS):
+    """Generate and measure a fresh synthetic database for each size."""
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in sizes:
+            database_url = f"sqlite:///{os.path.join(workdir, f'bench_{size}.db')}"
+            generated = os.path.join(workdir, f"generate_{size}.json")
+            measured = os.path.join(workdir, f"measure_{size}.json")
+            _subprocess(database_url, "generate", "--sessions", str(size), "--output", generated)
+            _subprocess(database_url, "measure", "--reruns", str(reruns), "--repeats", str(repeats), "--output", measured)
+            with open(generated) as handle:
+                generate_seconds = json.load(handle)["seconds"]
+            with open(measured) as handle:
+                results[str(size)] = dict(json.load(handle), generate_seconds=generate_seconds)
+    return results
+
+
+def _flatten(results, prefix=""):
+    """{'10000.operations.create_request.median_seconds': 0.1, ...} for comparing runs."""
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, float) and key.endswith("seconds") and not key.endswith("max_seconds"):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def regressions(results, baseline, ratio=REGRESSION_RATIO):
+    """Timings more than ratio times (and REGRESSION_MIN_SECONDS) slower than the same timing in baseline."""
+    before = _flatten(baseline)
+    return [
+        f"{key}: {seconds:.4f}s vs {before[key]:.4f}s"
+        for key, seconds in _flatten(results).items()
+        if key in before and not key.endswith("generate_seconds")
+        and seconds > before[key] * ratio and seconds - before[key] > REGRESSION_MIN_SECONDS
+    ]
+
+
+def _write(results, output):
+    report = json.dumps(results, indent=2, default=str)
+    if output:
+        with open(output, "w") as handle:
+            handle.write(report + "\n")
+    else:
+        print(report)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the app headlessly.")
+    parser.add_argument("command", choices=["startup", "generate", "measure", "suite"])
+    parser.add_argument("--sessions", type=int, default=SIZES[0], help="rows for generate")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="database sizes for suite")
+    parser.add_argument("--reruns", type=int, default=RERUNS)
+    parser.add_argument("--repeats", type=int, default=REPEATS)
+    parser.add_argument("--baseline", help="earlier suite JSON to compare against")
+    parser.add_argument("--output", help="write the JSON results to this file instead of stdout")
+    args = parser.parse_args()
+
+    failures = []
+    if args.command == "startup":
+        results = startup(reruns=args.reruns)
+        results["over_budget"] = failures = over_budget(results)
+    elif args.command == "generate":
+        require_throwaway()
+        results = {"sessions": args.sessions, "seconds": generate(args.sessions)}
+    elif args.command == "measure":
+        require_throwaway()
+        results = measure(args.reruns, args.repeats)
+    else:
+        results = suite(args.sizes, args.reruns, args.repeats)
+        if args.baseline:
+            with open(args.baseline) as handle:
+                failures = regressions(results, json.load(handle))
+            results["regressions"] = failures
+
+    _write(results, args.output)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
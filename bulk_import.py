@@ -0,0 +1,31 @@
+import streamlit as st
+import pandas as pd
+from importer import import_sessions, CHUNK_SIZE
+
+st.title("Bulk Import Instruction Sessions")
+st.write(
+    "Upload a CSV or Excel (.xlsx) file of past sessions. Column headers may use the database "
+    "field names or the labels from the Edit Instruction Sessions page; separate multiple SLOs with ';'."
+)
+
+uploaded = st.file_uploader("Session file", type=["csv", "xlsx"])
+chunk_size = st.number_input("Rows per transaction", min_value=100, max_value=100000, value=CHUNK_SIZE, step=100)
+dry_run = st.checkbox("Validate only (do not insert)")
+
+if uploaded is not None and st.button("Import"):
+    with st.spinner("Importing..."):
+        result = import_sessions(uploaded, filename=uploaded.name, chunk_size=int(chunk_size), dry_run=dry_run)
+
+    cols = st.columns(4)
+    cols[0].metric("Rows read", result['rows'])
+    cols[1].metric("Validated" if dry_run else "Inserted", result['accepted'])
+    cols[2].metric("Rejected", len(result['rejected']))
+    cols[3].metric("Rows / second", f"{result['rows_per_second']:,.0f}")
+
+    if result['rejected']:
+        rejected_df = pd.DataFrame(result['rejected'])
+        st.subheader("Rejected Rows")
+        st.dataframe(rejected_df)
+        st.download_button("Download rejected rows", rejected_df.to_csv(index=False), file_name="rejected_rows.csv")
+    elif not dry_run:
+        st.success("All rows imported.")
@@ -0,0 +1,90 @@
+import functools
+import threading
+import streamlit as st
+
+# Reads are served from memory until a write path bumps the data version.
+# The TTL is only a safety net for writes made by other processes.
+CACHE_TTL_SECONDS = 600
+# For cached_stable() reads, which only writes passing stable=True invalidate
+STABLE_TTL_SECONDS = 6 * 60 * 60
+
+
+@st.cache_resource
+def _version_state():
+    # Shared by every browser session in this process
+    return {"version": 0, "lock": threading.Lock()}
+
+
+def data_version():
+    return _version_state()["version"]
+
+
+def bump_data_version(stable=False):
+    """Invalidate all cached reads; call after committing a write.
+
+    stable=True also drops the cached_stable() reads, for writes to the data
+    they cover (e.g. a session of a closed semester).
+    """
+    state = _version_state()
+    with state["lock"]:
+        state["version"] += 1
+        _cached_call.clear()
+        _resource_call.clear()
+        if stable:
+            _stable_call.clear()
+    return state["version"]
+
+
+@st.cache_data(ttl=CACHE_TTL_SECONDS, max_entries=256, show_spinner=False)
+def _cached_call(func_key, version, args, kwargs, _func):
+    return _func(*args, **dict(kwargs))
+
+
+def cached(func):
+    """Cache a read function's result, keyed on its arguments and the data version."""
+    func_key = f"{func.__module__}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return _cached_call(func_key, data_version(), args, tuple(sorted(kwargs.items())), _func=func)
+
+    wrapper.uncached = func
+    return wrapper
+
+
+# Only cleared by bump_data_version(stable=True)
+@st.cache_data(ttl=STABLE_TTL_SECONDS, max_entries=256, show_spinner=False)
+def _stable_call(func_key, args, kwargs, _func):
+    return _func(*args, **dict(kwargs))
+
+
+def cached_stable(func):
+    """Cache a read keyed on its arguments alone, for results that rarely change (e.g. closed semesters).
+
+    Ordinary writes leave it alone; writes that pass bump_data_version(stable=True) clear it.
+    """
+    func_key = f"{func.__module__}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return _stable_call(func_key, args, tuple(sorted(kwargs.items())), _func=func)
+
+    wrapper.uncached = func
+    return wrapper
+
+
+@st.cache_resource(ttl=CACHE_TTL_SECONDS, max_entries=16, show_spinner=False)
+def _resource_call(func_key, version, args, kwargs, _func):
+    return _func(*args, **dict(kwargs))
+
+
+def cached_resource(func):
+    """Like cached(), but the result is shared rather than copied; it must be treated as read-only."""
+    func_key = f"{func.__module__}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return _resource_call(func_key, data_version(), args, tuple(sorted(kwargs.items())), _func=func)
+
+    wrapper.uncached = func
+    return wrapper
@@ -0,0 +1,88 @@
+"""Append-only change feed for instruction sessions.
+
+Every write path calls record() in its own transaction with the sessions
+it touched, which appends one session_changes row per session. Readers
+remember the last seq they saw and ask changed_since() for what came
+after it:
+
+- the sessions page merges just those sessions into the pages it holds
+  (session_store.refresh_page) instead of reloading them;
+- main.py calls sync_data_version() once per rerun, so the cached reads
+  notice writes made by other processes (bulk imports from the command
+  line, a second app server) without waiting for the cache TTL.
+
+Write paths in this process invalidate the caches through written() with
+the seq their write produced, so sync_data_version() only bumps again for
+seqs beyond the highest one already covered. On SQLite writers are
+serialized, so changes become visible in seq order and a write's commit
+follows every lower seq.
+"""
+import threading
+from datetime import datetime
+from sqlalchemy import select, insert, func
+from database import engine, SessionChange
+from cache import bump_data_version
+
+ACTIONS = ('insert', 'update', 'cancel', 'archive', 'restore')
+
+# Highest seq the cached reads in this process are known to include
+_synced = {'seq': None}
+_synced_lock = threading.Lock()
+
+
+def record(conn, session_ids, action):
+    """Append a change for each session; conn is the Connection or ORM Session of the write.
+
+    Returns the highest seq appended, or None when there were no sessions.
+    """
+    if action not in ACTIONS:
+        raise ValueError(f"Unknown change action: {action}")
+    changed_at = datetime.now()
+    rows = [{'session_id': session_id, 'action': action, 'changed_at': changed_at} for session_id in session_ids]
+    if not rows:
+        return None
+    return max(conn.execute(insert(SessionChange.__table__).returning(SessionChange.seq), rows).scalars().all())
+
+
+def latest_seq():
+    """The seq of the newest change, 0 if there are none (a single primary key lookup)."""
+    with engine.connect() as conn:
+        return conn.execute(select(func.coalesce(func.max(SessionChange.seq), 0))).scalar_one()
+
+
+def changed_since(seq):
+    """(newest seq, ids of the sessions changed after seq)."""
+    stmt = select(SessionChange.seq, SessionChange.session_id).where(SessionChange.seq > seq)
+    with engine.connect() as conn:
+        rows = conn.execute(stmt).all()
+    if not rows:
+        return seq, set()
+    return max(row.seq for row in rows), {row.session_id for row in rows}
+
+
+def written(*seqs, stable=False):
+    """Invalidate the cached reads after committing a write; seqs are what its record() calls returned.
+
+    stable is passed on to bump_data_version().
+    """
+    version = bump_data_version(stable=stable)
+    seqs = [seq for seq in seqs if seq is not None]
+    if seqs:
+        with _synced_lock:
+            # The bump came after the commit, so every lower seq is covered too
+            _synced['seq'] = max(seqs + [_synced['seq'] or 0])
+    return version
+
+
+def sync_data_version():
+    """Invalidate the cached reads if another process wrote since the last call.
+
+    Returns the newest seq; reads cached after this call are at least that current.
+    """
+    seq = latest_seq()
+    with _synced_lock:
+        if _synced['seq'] is not None and seq > _synced['seq']:
+            # Nothing says which semesters it touched, so closed ones are refreshed too
+            bump_data_version(stable=True)
+        _synced['seq'] = max(seq, _synced['seq'] or 0)
+    return seq
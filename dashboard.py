@@ -1,67 +1,91 @@
-import streamlit as st
-import pandas as pd
-from sqlalchemy import create_engine
-from database import Base, engine
-
-# Connect to SQLite DB
-engine = create_engine("sqlite:///acc_library_il.db")
-
-st.title("Library Instruction Dashboard")
-
-# Read table into DataFrame
-df = pd.read_sql_table('instruction_sessions', con=engine)
-
-# Fix: Use 'canceled' boolean (1 = True, 0 = False)
-canceled_df = df[df['canceled'] == 1]
-confirmed_df = df[(df['canceled'] == 0) | (df['canceled'].isna())]  # show NaN as not canceled
-
-
-# Display full confirmed session data
-st.subheader("All Confirmed Instruction Sessions")
-st.dataframe(confirmed_df)
-
-# Sessions by Campus
-st.subheader("Total Confirmed Sessions by Campus")
-campus_counts = confirmed_df['campus'].value_counts().reset_index()
-campus_counts.columns = ['Campus', 'Total Sessions']
-st.dataframe(campus_counts)
-
-# Sessions by Librarian
-st.subheader("Total Confirmed Sessions by Librarian")
-librarian_counts = confirmed_df['librarian_presenter'].value_counts().reset_index()
-librarian_counts.columns = ['Librarian', 'Total Sessions']
-st.dataframe(librarian_counts)
-
-# Librarian Instruction Session Breakdown by Type
-st.subheader("Librarian Instruction Session Breakdown by Type")
-type_counts = confirmed_df.groupby(['librarian_presenter', 'type']).size().unstack(fill_value=0)
-
-for expected_type in ['In-Person', 'Asynchronous', 'Synchronous']:
-    if expected_type not in type_counts.columns:
-        type_counts[expected_type] = 0
-
-type_counts['Total'] = type_counts['In-Person'] + type_counts['Asynchronous'] + type_counts['Synchronous']
-type_counts = type_counts.reset_index().rename(columns={'librarian_presenter': 'Librarian'})
-st.dataframe(type_counts)
-
-# Total Sessions by Month
-st.subheader("Total Confirmed Sessions by Month")
-confirmed_df['date_of_session'] = pd.to_datetime(confirmed_df['date_of_session'], errors='coerce')
-df_month = confirmed_df.dropna(subset=['date_of_session'])
-df_month['Month'] = df_month['date_of_session'].dt.strftime('%B %Y')
-
-month_counts = df_month['Month'].value_counts().reset_index()
-month_counts.columns = ['Month', 'Total Sessions']
-month_counts['SortDate'] = pd.to_datetime(month_counts['Month'], format='%B %Y')
-month_counts = month_counts.sort_values('SortDate').drop(columns=['SortDate'])
-
-ytd_total = month_counts['Total Sessions'].sum()
-ytd_row = pd.DataFrame([{'Month': 'Year to Date (YTD)', 'Total Sessions': ytd_total}])
-month_counts = pd.concat([month_counts, ytd_row], ignore_index=True)
-
-st.dataframe(month_counts)
-
-# Show total canceled session count
-st.subheader("Canceled Sessions")
-st.write(f"Total Canceled Sessions: {len(canceled_df)}")
-st.dataframe(canceled_df)  # optional: show canceled session details
+import io
+import streamlit as st
+import reports
+import exports
+import profiling
+import archive
+from semesters import recent_semesters, recent_academic_years, current_semester
+
+st.title("Library Instruction Dashboard")
+
+# Rollups come from the precomputed summary tables via reports.py.
+# Everything is scoped to the current semester unless another is chosen.
+scope_options = ["All semesters"] + recent_semesters()
+scope = st.selectbox("Semester", scope_options, index=scope_options.index(current_semester()))
+semester = None if scope == "All semesters" else scope
+
+
+def session_list(load, canceled, key):
+    """Show one page of a session listing; only that page is read from the database."""
+    total = reports.listed_count(canceled, semester)
+    pages = max((total - 1) // reports.LIST_PAGE_SIZE + 1, 1)
+    page = 1
+    if pages > 1:
+        page = st.number_input("Page", min_value=1, max_value=pages, value=1, key=f"{key}_{scope}")
+    first_row = (page - 1) * reports.LIST_PAGE_SIZE
+    st.caption(f"Showing {min(first_row + 1, total)}-{min(first_row + reports.LIST_PAGE_SIZE, total)} of {total}")
+    st.dataframe(load(semester, page=page))
+
+
+# Confirmed session data, a page at a time
+with profiling.section("Confirmed sessions"):
+    st.subheader("Confirmed Instruction Sessions")
+    session_list(reports.confirmed_sessions, False, "confirmed_page")
+
+with profiling.section("Rollups"):
+    # Sessions by Campus
+    st.subheader("Total Confirmed Sessions by Campus")
+    st.dataframe(reports.sessions_by_campus(semester))
+
+    # Sessions by Librarian
+    st.subheader("Total Confirmed Sessions by Librarian")
+    st.dataframe(reports.sessions_by_librarian(semester))
+
+    # Librarian Instruction Session Breakdown by Type
+    st.subheader("Librarian Instruction Session Breakdown by Type")
+    st.dataframe(reports.librarian_type_breakdown(semester))
+
+    # Total Sessions by Month
+    st.subheader("Total Confirmed Sessions by Month")
+    st.dataframe(reports.sessions_by_month(semester))
+
+    # SLO Frequency
+    st.subheader("SLO Frequency (Confirmed Sessions)")
+    st.dataframe(reports.slo_frequency(semester))
+
+# Show total canceled session count
+with profiling.section("Canceled sessions"):
+    st.subheader("Canceled Sessions")
+    st.write(f"Total Canceled Sessions: {reports.canceled_count(semester)}")
+    session_list(reports.canceled_sessions, True, "canceled_page")  # optional: show canceled session details
+
+# Export sessions with their SLOs, streamed from the database in chunks
+st.subheader("Export Sessions")
+periods = ["All sessions"] + recent_semesters() + [f"Academic year {year}" for year in recent_academic_years()]
+cols = st.columns(3)
+with cols[0]:
+    export_period = st.selectbox("Period", periods)
+    # Closed semesters moved out by archive.py are exported from the archive
+    from_archive = archive.archive_engine() is not None and st.checkbox("From the archive")
+with cols[1]:
+    export_format = st.selectbox("Format", list(exports.FORMATS))
+with cols[2]:
+    slo_mode = st.selectbox(
+        "SLOs", list(exports.SLO_MODES),
+        format_func=lambda mode: "One row per session" if mode == 'aggregate' else "One row per SLO"
+    )
+
+if st.button("Prepare Export"):
+    period_filter = {}
+    if export_period.startswith("Academic year "):
+        period_filter['academic_year'] = export_period.removeprefix("Academic year ")
+    elif export_period != "All sessions":
+        period_filter['semester'] = export_period
+
+    buffer = io.BytesIO()
+    with st.spinner("Exporting..."), profiling.section("Export"):
+        row_count = exports.export_sessions(
+            buffer, export_format, slo_mode=slo_mode, archived=from_archive, **period_filter
+        )
+    file_name = f"instruction_sessions_{export_period.lower().replace(' ', '_')}.{export_format}"
+    st.download_button(f"Download {row_count} rows", buffer.getvalue(), file_name=file_name)
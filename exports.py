@@ -0,0 +1,205 @@
+"""Streaming export of instruction sessions (with SLOs) to CSV, Excel or Parquet.
+
+Rows are fetched with a server-side cursor in chunks and written as they
+arrive, so a multi-year export never holds the whole table in memory::
+
+    python exports.py fall_2025.xlsx --semester "Fall 2025"
+    python exports.py ay_2025.parquet --academic-year 2025-2026 --slos flatten
+    python exports.py fall_2021.csv --semester "Fall 2021" --archived
+"""
+import argparse
+import io
+from datetime import date, time
+import pandas as pd
+from sqlalchemy import select, func, false
+from database import engine, init_db, InstructionSession, InstructionSessionSLO
+from session_store import filter_clauses
+from semesters import academic_year_bounds
+
+CHUNK_SIZE = 2000
+FORMATS = ('csv', 'xlsx', 'parquet')
+SLO_MODES = ('aggregate', 'flatten')
+SLO_SEPARATOR = '; '
+
+# Reference keys and edit versions are internal; exports carry the campus and librarian names
+session_columns = [
+    column for column in InstructionSession.__table__.columns
+    if column.name not in ('campus_id', 'librarian_id', 'version')
+]
+
+
+def _aggregated_slos():
+    """Correlated subquery joining a session's SLOs into one string."""
+    slo = InstructionSessionSLO.slo
+    if engine.dialect.name == 'postgresql':
+        joined = func.string_agg(slo, SLO_SEPARATOR)
+    else:
+        joined = func.group_concat(slo, SLO_SEPARATOR)
+    return (
+        select(joined)
+        .where(InstructionSessionSLO.session_id == InstructionSession.id)
+        .scalar_subquery()
+        .label('slos')
+    )
+
+
+def export_query(slo_mode='aggregate', include_canceled=True, academic_year=None, **filters):
+    """Build the export SELECT; filters are those accepted by session_store.filter_clauses."""
+    if academic_year:
+        filters['start_date'], filters['end_date'] = academic_year_bounds(academic_year)
+
+    if slo_mode == 'flatten':
+        # One row per session and SLO; sessions without SLOs keep a single row
+        stmt = (
+            select(*session_columns, InstructionSessionSLO.slo)
+            .outerjoin(InstructionSessionSLO, InstructionSessionSLO.session_id == InstructionSession.id)
+            .order_by(InstructionSession.id, InstructionSessionSLO.id)
+        )
+    else:
+        stmt = select(*session_columns, _aggregated_slos()).order_by(InstructionSession.id)
+
+    stmt = stmt.where(*filter_clauses(**filters))
+    if not include_canceled:
+        stmt = stmt.where(InstructionSession.canceled == false())
+    return stmt
+
+
+def iter_chunks(stmt, chunk_size=CHUNK_SIZE, bind=None):
+    """Yield DataFrames of at most chunk_size rows using a server-side cursor.
+
+    A query without rows yields one empty DataFrame, so writers still get the column headers.
+    """
+    with (bind or engine).connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=chunk_size).execute(stmt)
+        columns = list(result.keys())
+        empty = True
+        for partition in result.partitions():
+            empty = False
+            yield pd.DataFrame([tuple(row) for row in partition], columns=columns)
+        if empty:
+            yield pd.DataFrame(columns=columns)
+
+
+def _write_csv(chunks, handle):
+    header = True
+    for chunk in chunks:
+        chunk.to_csv(handle, index=False, header=header)
+        header = False
+
+
+def _write_xlsx(chunks, target):
+    # openpyxl is optional; write-only mode streams rows to disk instead of building the sheet in memory
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Sessions")
+    header = False
+    for chunk in chunks:
+        if not header:
+            sheet.append(list(chunk.columns))
+            header = True
+        for row in chunk.itertuples(index=False):
+            sheet.append([None if pd.isna(value) else value for value in row])
+    workbook.save(target)
+
+
+def _arrow_type(column, pa):
+    python_type = column.type.python_type
+    if python_type is bool:
+        return pa.bool_()
+    if python_type is int:
+        return pa.int64()
+    if python_type is date:
+        return pa.date32()
+    if python_type is time:
+        return pa.time64('us')
+    return pa.string()
+
+
+def _write_parquet(chunks, target, slo_column):
+    # pyarrow is optional; a fixed schema keeps every chunk's row group compatible
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    fields = [pa.field(column.name, _arrow_type(column, pa)) for column in session_columns]
+    schema = pa.schema(fields + [pa.field(slo_column, pa.string())])
+    with pq.ParquetWriter(target, schema) as writer:
+        for chunk in chunks:
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+
+def export_sessions(target, fmt, slo_mode='aggregate', chunk_size=CHUNK_SIZE, archived=False, **filters):
+    """Stream the filtered sessions to a path or binary file object. Returns the row count.
+
+    With archived=True the sessions come from the archive database (see archive.py).
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    if slo_mode not in SLO_MODES:
+        raise ValueError(f"Unsupported SLO mode: {slo_mode}")
+
+    bind = None
+    if archived:
+        import archive
+        bind = archive.archive_engine()
+        if bind is None:
+            raise ValueError("No semesters have been archived")
+
+    counted = [0]
+
+    def counting(chunks):
+        for chunk in chunks:
+            counted[0] += len(chunk)
+            yield chunk
+
+    chunks = counting(iter_chunks(export_query(slo_mode, **filters), chunk_size, bind))
+    if fmt == 'csv':
+        if hasattr(target, 'write'):
+            # Binary buffer (e.g. for st.download_button)
+            handle = io.TextIOWrapper(target, encoding='utf-8', newline='')
+            _write_csv(chunks, handle)
+            handle.flush()
+            handle.detach()
+        else:
+            with open(target, 'w', encoding='utf-8', newline='') as handle:
+                _write_csv(chunks, handle)
+    elif fmt == 'xlsx':
+        _write_xlsx(chunks, target)
+    else:
+        _write_parquet(chunks, target, 'slo' if slo_mode == 'flatten' else 'slos')
+    return counted[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export instruction sessions with their SLOs.")
+    parser.add_argument("path", help="output file; the format comes from its extension (.csv, .xlsx, .parquet)")
+    parser.add_argument("--semester", help="e.g. 'Fall 2025'")
+    parser.add_argument("--academic-year", help="e.g. 2025-2026 (Fall through Summer)")
+    parser.add_argument("--campus")
+    parser.add_argument("--librarian")
+    parser.add_argument("--slos", choices=SLO_MODES, default='aggregate',
+                        help="one row per session with SLOs joined, or one row per session and SLO")
+    parser.add_argument("--exclude-canceled", action="store_true")
+    parser.add_argument("--archived", action="store_true", help="export from the archive of closed semesters")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+    init_db()
+
+    fmt = args.path.rsplit('.', 1)[-1].lower()
+    rows = export_sessions(
+        args.path,
+        fmt,
+        slo_mode=args.slos,
+        chunk_size=args.chunk_size,
+        archived=args.archived,
+        include_canceled=not args.exclude_canceled,
+        academic_year=args.academic_year,
+        semester=args.semester,
+        campus=args.campus,
+        librarian=args.librarian,
+    )
+    print(f"Wrote {rows} rows to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,38 +1,20 @@
 from datetime import date
 import streamlit as st
-from database import InstructionSession, InstructionSessionSLO, Session
-from campuses import campus_list
-from librarians import librarian_list
-import smtplib
-from email.mime.text import MIMEText
+from session_store import create_request
+from notifications import start_worker
+import references
 
 # --- CONFIG ---
 
 min_date = date.today()  # Minimum date is today
 
-# Map campuses to email addresses
-campus_email_map = {
-    "Highland": "cassidy.reid@austincc.edu",
-    "Hays": "cassidy.reid@austincc.edu",
-    "Elgin": "cassidy.reid@austincc.edu",
-    "Cypress Creek": "cassidy.reid@austincc.edu",
-    "Eastview": "cassidy.reid@austincc.edu",
-    "Round Rock": "cassidy.reid@austincc.edu",
-    # Add all needed campuses here
-}
-
-SMTP_SERVER = "smtp.austincc.edu"
-SMTP_PORT = 587
-SMTP_USERNAME = None
-SMTP_PASSWORD = None
-FROM_EMAIL = "noreply@austincc.edu"
-
 # --- STREAMLIT FORM ---
 
 st.title("Add New Library Instruction Session")
 
-campus_names = [campus['name'] for campus in campus_list]
-librarian_names = [lib['name'] for lib in librarian_list]
+# Active names from the reference tables, already sorted
+campus_names = references.campus_names()
+librarian_names = references.librarian_names()
 
 with st.form("session_form"):
     first = st.text_input("First name:")
@@ -48,9 +30,9 @@ with st.form("session_form"):
 
     campus = None
     if type == "In-Person":
-        campus = st.selectbox("Campus", sorted(campus_names))
+        campus = st.selectbox("Campus", campus_names)
 
-    librarian_presenter = st.selectbox("Librarian", sorted(librarian_names))
+    librarian_presenter = st.selectbox("Librarian", librarian_names)
 
     course_code = st.text_input("Course Code (4 characters)")
     course_number = st.text_input("Course Number (4 characters)")
@@ -80,9 +62,10 @@ if submit:
     elif len(course_number) != 4:
         st.error("Course Number must be exactly 4 characters.")
     else:
-        session = Session()
-
-        new_session = InstructionSession(
+        # The notification email is queued with the request and sent in the background
+        create_request(
+            slos,
+            notify=True,
             date_1=date_1,
             date_2=date_2,
             first=first,
@@ -95,42 +78,5 @@ if submit:
             type=type
         )
 
-        session.add(new_session)
-        session.flush()  # Get ID for SLO linking
-
-        for slo in slos:
-            slo_entry = InstructionSessionSLO(session_id=new_session.id, slo=slo)
-            session.add(slo_entry)
-
-        session.commit()
-        session.close()
-
-        # --- EMAIL LOGIC ---
-        recipient_email = campus_email_map.get(campus, "default_lib@yourcollege.edu")
-        subject = f"New Library Instruction Request - {campus}"
-        body = f"""New Instruction Session Requested:
-
-Name: {first} {last}
-Email: {email}
-Campus: {campus}
-Type: {type}
-Requested Dates: {date_1} or {date_2}
-Course: {course_code}-{course_number}
-Requested SLOs: {', '.join(slos)}
-Requested Librarian: {librarian_presenter}
-
-Please review this request in the system."""
-
-        msg = MIMEText(body)
-        msg['Subject'] = subject
-        msg['From'] = FROM_EMAIL
-        msg['To'] = recipient_email
-
-        try:
-            with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-                server.starttls()
-                server.login(SMTP_USERNAME, SMTP_PASSWORD)
-                server.send_message(msg)
-            st.success("New session added and notification email sent successfully!")
-        except Exception as e:
-            st.error(f"Session saved but email failed to send: {e}")
+        start_worker().wake()
+        st.success("New session added; the notification email will be sent shortly.")
@@ -0,0 +1,272 @@
+"""Bulk import of historical instruction sessions from CSV or Excel files.
+
+Files are read in chunks, each chunk is validated and then written with
+executemany inserts in one transaction, so years of history load without
+per-row ORM flushes. Usage::
+
+    python importer.py sessions_2019_2024.csv --rejects rejected.csv
+"""
+import argparse
+import functools
+import math
+import re
+import time as timer
+from datetime import datetime
+import pandas as pd
+from sqlalchemy import insert
+from database import engine, init_db, InstructionSession, InstructionSessionSLO
+from references import lookups, with_reference_ids
+from session_store import parse_date
+from semesters import session_semester, is_closed
+import summaries
+import changes
+
+CHUNK_SIZE = 5000
+
+# Spreadsheet headers (normalized) -> InstructionSession columns. Model column
+# names are accepted as-is, plus the labels used by the session editor.
+COLUMN_ALIASES = {
+    'date_confirmed': 'date_of_session',
+    'date_requested_1': 'date_1',
+    'date_requested_2': 'date_2',
+    'librarian': 'librarian_presenter',
+    'first_name': 'first',
+    'last_name': 'last',
+    'students': 'number_of_students',
+    'slo': 'slos',
+}
+DATE_COLUMNS = ['date_of_session', 'date_1', 'date_2']
+# Reference keys are derived from the campus and librarian names; new rows start at version 1
+MODEL_COLUMNS = {column.name for column in InstructionSession.__table__.columns} - {'id', 'campus_id', 'librarian_id', 'version'}
+TEXT_COLUMNS = {
+    column.name for column in InstructionSession.__table__.columns
+    if column.type.python_type is str
+}
+
+
+def _normalize_header(header):
+    key = re.sub(r'[^a-z0-9]+', '_', str(header).strip().lower()).strip('_')
+    return COLUMN_ALIASES.get(key, key)
+
+
+def read_chunks(source, filename=None, chunk_size=CHUNK_SIZE):
+    """Yield DataFrames of at most chunk_size rows (all values as strings) from a CSV or XLSX file."""
+    name = (filename or str(source)).lower()
+    if name.endswith(('.xlsx', '.xlsm')):
+        yield from _excel_chunks(source, chunk_size)
+    else:
+        yield from pd.read_csv(source, dtype=str, keep_default_na=False, chunksize=chunk_size)
+
+
+def _excel_chunks(source, chunk_size):
+    # openpyxl is optional; it is only needed for Excel imports
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(value) if value is not None else '' for value in next(rows, [])]
+        batch = []
+        for values in rows:
+            batch.append(['' if value is None else value for value in values])
+            if len(batch) == chunk_size:
+                yield pd.DataFrame(batch, columns=header)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=header)
+    finally:
+        workbook.close()
+
+
+def _blank(value):
+    return value is None or (isinstance(value, float) and pd.isna(value)) or str(value).strip() == ''
+
+
+def _text(value):
+    # Excel hands back numbers for cells like course numbers
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_date_text(value):
+    # Historical files repeat the same dates thousands of times
+    return parse_date(value)
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse_time_text(value):
+    for fmt in ("%H:%M", "%H:%M:%S", "%I:%M %p", "%I:%M%p"):
+        try:
+            return datetime.strptime(value, fmt).time()
+        except ValueError:
+            continue
+    return None
+
+
+def _parse_time(value):
+    if isinstance(value, datetime):
+        return value.time()
+    if hasattr(value, 'hour'):
+        return value
+    return _parse_time_text(str(value).strip())
+
+
+def validate_row(raw, data=None):
+    """Turn one spreadsheet row into (session values, SLO list), or raise ValueError.
+
+    data is the references.lookups() result, passed in to skip the lookup per row.
+    """
+    data = data or lookups()
+    values, slos = {}, []
+    for column, value in raw.items():
+        if column == 'slos':
+            if not _blank(value):
+                slos = [slo.strip() for slo in re.split(r'[;|]', str(value)) if slo.strip()]
+            continue
+        if column not in MODEL_COLUMNS or _blank(value):
+            continue
+        values[column] = _text(value) if column in TEXT_COLUMNS else value
+
+    for column in DATE_COLUMNS:
+        if column in values:
+            value = values[column]
+            if isinstance(value, str):
+                parsed = _parse_date_text(value)
+            else:
+                parsed = parse_date(value.date() if isinstance(value, datetime) else value)
+            if parsed is None:
+                raise ValueError(f"Unrecognized {column}: {values[column]!r}")
+            values[column] = parsed
+
+    if 'campus' in values:
+        campus = data.campus_by_lower.get(str(values['campus']).lower())
+        if campus is None:
+            raise ValueError(f"Unknown campus: {values['campus']!r}")
+        values['campus'] = campus
+
+    if 'librarian_presenter' in values:
+        librarian = data.librarian_by_lower.get(str(values['librarian_presenter']).lower())
+        if librarian is None:
+            raise ValueError(f"Unknown librarian: {values['librarian_presenter']!r}")
+        values['librarian_presenter'] = librarian
+
+    if 'number_of_students' in values:
+        try:
+            count = float(values['number_of_students'])
+        except (TypeError, ValueError, OverflowError):
+            count = None
+        # 'inf' parses as a float but is no head count
+        if count is None or not math.isfinite(count) or count < 0:
+            raise ValueError(f"Invalid number_of_students: {values['number_of_students']!r}")
+        values['number_of_students'] = int(count)
+
+    if 'time' in values:
+        parsed = _parse_time(values['time'])
+        if parsed is None:
+            raise ValueError(f"Unrecognized time: {values['time']!r}")
+        values['time'] = parsed
+
+    values['canceled'] = str(values.get('canceled', '')).strip().lower() in ('1', 'true', 'yes', 'y')
+    # Always derived from the dates, whatever the file's semester column says
+    values['semester'] = session_semester(values.get('date_of_session'), values.get('date_1'))
+    return with_reference_ids(values, data), slos
+
+
+def insert_sessions(conn, rows):
+    """Insert sessions and their SLOs with two executemany statements, then update the summaries and change log.
+
+    rows are (session values, SLO list) pairs as returned by validate_row().
+    Returns the change seq of the insert (see changes.written).
+    """
+    sessions_table = InstructionSession.__table__
+    # Every row needs the same keys for a single executemany
+    keys = set().union(*(values.keys() for values, _ in rows))
+    params = [{key: values.get(key) for key in keys} for values, _ in rows]
+    result = conn.execute(
+        insert(sessions_table).returning(sessions_table.c.id, sort_by_parameter_order=True),
+        params,
+    )
+    session_ids = result.scalars().all()
+
+    slo_params = [
+        {'session_id': session_id, 'slo': slo}
+        for session_id, (_, slos) in zip(session_ids, rows)
+        for slo in slos
+    ]
+    if slo_params:
+        conn.execute(insert(InstructionSessionSLO.__table__), slo_params)
+
+    summaries.apply_deltas(conn, after=[dict(values, slos=slos) for values, slos in rows])
+    return changes.record(conn, session_ids, 'insert')
+
+
+def import_sessions(source, filename=None, chunk_size=CHUNK_SIZE, dry_run=False):
+    """Validate and insert every row of a file. Returns a summary dict with the rejected rows."""
+    started = timer.perf_counter()
+    accepted, rejected, total = 0, [], 0
+    committed = closed_semesters = False
+    seq = None
+    data = lookups()
+
+    try:
+        for chunk in read_chunks(source, filename, chunk_size):
+            chunk.columns = [_normalize_header(column) for column in chunk.columns]
+            rows = []
+            for offset, raw in enumerate(chunk.to_dict('records')):
+                line = total + offset + 2  # 1-based, after the header row
+                try:
+                    rows.append(validate_row(raw, data))
+                except ValueError as e:
+                    rejected.append({'row': line, 'reason': str(e), **raw})
+            total += len(chunk)
+
+            if rows and not dry_run:
+                with engine.begin() as conn:
+                    seq = insert_sessions(conn, rows)
+                committed = True
+                closed_semesters = closed_semesters or any(is_closed(values['semester']) for values, _ in rows)
+            accepted += len(rows)
+    finally:
+        # Earlier chunks stay committed if a later one fails, so the caches must still see them
+        if committed:
+            changes.written(seq, stable=closed_semesters)
+
+    elapsed = timer.perf_counter() - started
+    return {
+        'rows': total,
+        'accepted': accepted,
+        'rejected': rejected,
+        'seconds': elapsed,
+        'rows_per_second': total / elapsed if elapsed else 0.0,
+        'dry_run': dry_run,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import instruction sessions from CSV or Excel.")
+    parser.add_argument("path")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="validate only, insert nothing")
+    parser.add_argument("--rejects", help="write rejected rows to this CSV file")
+    args = parser.parse_args()
+    init_db()
+
+    result = import_sessions(args.path, chunk_size=args.chunk_size, dry_run=args.dry_run)
+    verb = "Validated" if args.dry_run else "Inserted"
+    print(
+        f"{verb} {result['accepted']} of {result['rows']} rows in {result['seconds']:.2f}s "
+        f"({result['rows_per_second']:.0f} rows/s); {len(result['rejected'])} rejected."
+    )
+    if result['rejected']:
+        if args.rejects:
+            pd.DataFrame(result['rejected']).to_csv(args.rejects, index=False)
+            print(f"Rejected rows written to {args.rejects}")
+        else:
+            for rejection in result['rejected'][:20]:
+                print(f"  row {rejection['row']}: {rejection['reason']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import streamlit as st
+import analytics
+import profiling
+from semesters import recent_semesters, current_semester
+
+st.title("Instruction Analytics")
+
+# Computed by analytics.py from grouped queries; closed semesters stay cached across saves
+scope_options = ["All semesters"] + recent_semesters()
+scope = st.selectbox("Semester", scope_options, index=scope_options.index(current_semester()))
+semester = None if scope == "All semesters" else scope
+
+with profiling.section("SLO coverage"):
+    st.subheader("SLO Coverage")
+    cols = st.columns(2)
+    with cols[0]:
+        group = st.radio("By", analytics.COVERAGE_GROUPS, format_func=str.title, horizontal=True)
+    with cols[1]:
+        show_shares = st.toggle("Share of sessions", help="Fraction of each row's sessions that addressed the SLO.")
+    coverage = analytics.slo_coverage(semester, group=group)
+    if coverage.empty:
+        st.write("No confirmed sessions in this period.")
+    elif show_shares:
+        shares = analytics.coverage_shares(coverage)
+        st.dataframe(
+            shares,
+            hide_index=True,
+            column_config={
+                column: st.column_config.ProgressColumn(column, format="percent", min_value=0, max_value=1)
+                for column in shares.columns[2:]
+            },
+        )
+    else:
+        st.dataframe(coverage, hide_index=True)
+
+with profiling.section("Student reach"):
+    st.subheader("Students Reached by Month")
+    months = analytics.students_by_month(semester)
+    if months.empty:
+        st.write("No confirmed sessions in this period.")
+    else:
+        st.bar_chart(months, x='Month', y='Students')
+        st.dataframe(months, hide_index=True)
+
+    st.subheader("Students Reached by Semester")
+    st.dataframe(analytics.students_by_semester(), hide_index=True)
+
+with profiling.section("Year over year"):
+    st.subheader("Year over Year")
+    period = st.radio("Compare", ['semester', 'month'], format_func=str.title, horizontal=True)
+    st.caption("Each row next to the same semester or month a year earlier. The current one is still in progress.")
+    st.dataframe(analytics.year_over_year(period), hide_index=True)
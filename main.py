@@ -1,5 +1,48 @@
 import streamlit as st
+import profiling
+import changes
 
-st.title("Library Instruction App")
-st.write("Welcome to the ACC Library Instruction Database App!")
-st.write("Use the sidebar to navigate to Dashboard, Instruction Form, or Sessions.")
+# Entry point: streamlit run main.py
+# Each page's module (and what it imports, e.g. pandas) is only loaded
+# when that page is first opened.
+
+
+@st.cache_resource(show_spinner="Preparing the database...")
+def init_app():
+    """Create and migrate the schema and start the notification worker once per process, not on every rerun."""
+    from database import engine, init_db
+    from notifications import start_worker
+    if profiling.enabled():
+        profiling.install(engine)
+    applied = init_db()
+    # Delivers emails still queued from before a restart without waiting for a new request
+    start_worker()
+    return applied
+
+
+def home():
+    st.title("Library Instruction App")
+    st.write("Welcome to the ACC Library Instruction Database App!")
+    st.write("Use the sidebar to navigate to Dashboard, Instruction Form, Sessions, or Analytics.")
+
+
+init_app()
+# Clears the cached reads if another process (e.g. a command-line import) wrote since the last rerun
+changes.sync_data_version()
+
+page = st.navigation([
+    st.Page(home, title="Home", default=True),
+    st.Page("dashboard.py", title="Dashboard"),
+    st.Page("ilform.py", title="Instruction Form"),
+    st.Page("sessions.py", title="Sessions"),
+    st.Page("bulk_import.py", title="Bulk Import"),
+    st.Page("insights.py", title="Analytics"),
+])
+profiling.start_run(page.title)
+try:
+    page.run()
+finally:
+    # Recorded even when the page stops early (st.rerun, st.stop)
+    profile = profiling.finish_run()
+if profile:
+    profiling.render_panel(profile)
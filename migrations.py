@@ -0,0 +1,256 @@
+"""Versioned schema migrations for the instruction database.
+
+Run ``python migrations.py upgrade`` to apply pending migrations to an
+existing database, ``status`` to list them and ``check`` to show which
+index each dashboard/editor query uses.
+"""
+import argparse
+from datetime import datetime
+from sqlalchemy import text, inspect
+
+
+
+def _build_summaries(conn):
+    # Imported here: summaries imports the models from database, which imports this module
+    import summaries
+    summaries.rebuild(conn)
+
+
+def _key_summaries_by_semester(conn):
+    # The summaries are derived data: recreate them with the semester key and recompute
+    from database import Base, SessionSummary, SloSummary
+    tables = [SessionSummary.__table__, SloSummary.__table__]
+    for table in tables:
+        conn.execute(text(f"DROP TABLE IF EXISTS {table.name}"))
+    Base.metadata.create_all(conn, tables=tables)
+    _build_summaries(conn)
+
+
+def _add_reference_keys(conn):
+    columns = {column['name'] for column in inspect(conn).get_columns('instruction_sessions')}
+    if 'campus_id' not in columns:
+        conn.execute(text("ALTER TABLE instruction_sessions ADD COLUMN campus_id INTEGER REFERENCES campuses (id)"))
+    if 'librarian_id' not in columns:
+        conn.execute(text("ALTER TABLE instruction_sessions ADD COLUMN librarian_id INTEGER REFERENCES librarians (id)"))
+
+
+def _add_version_column(conn):
+    columns = {column['name'] for column in inspect(conn).get_columns('instruction_sessions')}
+    if 'version' not in columns:
+        conn.execute(text("ALTER TABLE instruction_sessions ADD COLUMN version INTEGER NOT NULL DEFAULT 1"))
+
+
+def _seed_references(conn):
+    import references
+    references.seed(conn)
+
+
+def _derive_semesters(conn):
+    import archive
+    archive.backfill_semesters(conn)
+
+
+def _create_search_index(conn):
+    import search
+    search.create_index(conn)
+
+
+def _autoincrement_session_ids(conn):
+    """Rebuild the session tables with AUTOINCREMENT (SQLite only).
+
+    Without it SQLite hands out max(id) + 1, so a new session could take
+    the id of one moved to the archive. The sequence starts above the
+    highest id in either database.
+    """
+    if conn.dialect.name != 'sqlite':
+        return  # server databases use sequences, which never reuse an id
+    from sqlalchemy import select, func
+    from sqlalchemy.schema import CreateTable
+    import archive
+    import search
+
+    rebuilt_triggers = False
+    for table in archive.ARCHIVED_TABLES:
+        name, staging = table.name, f"{table.name}_rebuild"
+        existing = conn.execute(
+            text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": name}
+        ).scalar()
+        if 'AUTOINCREMENT' not in existing.upper():
+            columns = ", ".join(f'"{column.name}"' for column in table.columns)
+            # Triggers (the search index's) go with the old table; recreated below
+            triggers = conn.execute(
+                text("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = :name"), {"name": name}
+            ).scalars().all()
+            for trigger in triggers:
+                conn.execute(text(f'DROP TRIGGER "{trigger}"'))
+            rebuilt_triggers = rebuilt_triggers or bool(triggers)
+            create = str(CreateTable(table).compile(conn)).replace(f"CREATE TABLE {name} ", f"CREATE TABLE {staging} ", 1)
+            conn.execute(text(create))
+            conn.execute(text(f"INSERT INTO {staging} ({columns}) SELECT {columns} FROM {name}"))
+            conn.execute(text(f"DROP TABLE {name}"))
+            conn.execute(text(f"ALTER TABLE {staging} RENAME TO {name}"))
+            for index in table.indexes:
+                index.create(conn)
+
+        highest = [conn.execute(select(func.max(table.c.id))).scalar() or 0]
+        highest.append(conn.execute(text("SELECT seq FROM sqlite_sequence WHERE name = :name"), {"name": name}).scalar() or 0)
+        archived = archive.archive_engine()
+        if archived is not None:
+            with archived.connect() as archive_conn:
+                highest.append(archive_conn.execute(select(func.max(table.c.id))).scalar() or 0)
+        conn.execute(text("DELETE FROM sqlite_sequence WHERE name = :name"), {"name": name})
+        conn.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES (:name, :seq)"), {"name": name, "seq": max(highest)})
+    if rebuilt_triggers:
+        search.create_index(conn)
+
+
+# Each migration is (version, description, statements). A statement is SQL
+# text or a callable taking the connection. Statements must be safe to run
+# against a database that create_all() already built from the current
+# models, hence IF [NOT] EXISTS and the column checks.
+MIGRATIONS = [
+    (1, "Add indexes for dashboard rollups and editor filters", [
+        "CREATE INDEX IF NOT EXISTS ix_sessions_canceled_date ON instruction_sessions (canceled, date_of_session)",
+        "CREATE INDEX IF NOT EXISTS ix_sessions_canceled_campus ON instruction_sessions (canceled, campus)",
+        "CREATE INDEX IF NOT EXISTS ix_sessions_canceled_librarian_type ON instruction_sessions (canceled, librarian_presenter, type)",
+        "CREATE INDEX IF NOT EXISTS ix_sessions_date_1 ON instruction_sessions (date_1)",
+        "CREATE INDEX IF NOT EXISTS ix_sessions_semester ON instruction_sessions (semester)",
+        "CREATE INDEX IF NOT EXISTS ix_session_slos_session_id ON instruction_session_slos (session_id)",
+    ]),
+    (2, "Populate the session and SLO summary tables", [
+        _build_summaries,
+    ]),
+    (3, "Key sessions to the campus and librarian reference tables", [
+        _add_reference_keys,
+        "CREATE INDEX IF NOT EXISTS ix_sessions_canceled_campus_id ON instruction_sessions (canceled, campus_id)",
+        "CREATE INDEX IF NOT EXISTS ix_sessions_canceled_librarian_id ON instruction_sessions (canceled, librarian_id)",
+        "DROP INDEX IF EXISTS ix_sessions_canceled_campus",
+        _seed_references,
+    ]),
+    (4, "Add the full-text search index over session text (SQLite)", [
+        _create_search_index,
+    ]),
+    (5, "Add a version column for conflict-safe edits", [
+        _add_version_column,
+    ]),
+    (6, "Derive every session's semester from its dates", [
+        _derive_semesters,
+        "CREATE INDEX IF NOT EXISTS ix_sessions_canceled_semester ON instruction_sessions (canceled, semester)",
+    ]),
+    (7, "Never reuse the ids of archived sessions (SQLite AUTOINCREMENT)", [
+        _autoincrement_session_ids,
+    ]),
+    (8, "Key the summary tables by semester", [
+        _key_summaries_by_semester,
+    ]),
+    (9, "Drop the librarian x type index the summary tables replaced", [
+        "DROP INDEX IF EXISTS ix_sessions_canceled_librarian_type",
+    ]),
+]
+
+
+def _ensure_version_table(conn):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version INTEGER PRIMARY KEY, description VARCHAR, applied_at VARCHAR)"
+    ))
+
+
+def applied_versions(engine):
+    with engine.begin() as conn:
+        _ensure_version_table(conn)
+        return {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+
+def upgrade(engine):
+    """Apply pending migrations in order, one transaction each. Returns the versions applied."""
+    done = applied_versions(engine)
+    applied = []
+    for version, description, statements in MIGRATIONS:
+        if version in done:
+            continue
+        with engine.begin() as conn:
+            for statement in statements:
+                if callable(statement):
+                    statement(conn)
+                else:
+                    conn.execute(text(statement))
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, description, applied_at) VALUES (:v, :d, :t)"),
+                {"v": version, "d": description, "t": datetime.now().isoformat(timespec="seconds")},
+            )
+        applied.append(version)
+    return applied
+
+
+def _capture_queries(engine):
+    """Run the real dashboard and editor queries once, recording their SQL and parameters."""
+    from sqlalchemy import event
+    import reports
+    import session_store
+    from references import lookups
+    from semesters import current_semester
+
+    captured = []
+    current = [None]
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        captured.append((current[0], statement, parameters))
+
+    workload = [
+        ("dashboard: sessions by campus", reports.sessions_by_campus.uncached, {}),
+        ("dashboard: sessions by librarian", reports.sessions_by_librarian.uncached, {}),
+        ("dashboard: librarian x type", reports.librarian_type_breakdown.uncached, {}),
+        ("dashboard: sessions by month", reports.sessions_by_month.uncached, {}),
+        ("dashboard: canceled count", reports.canceled_count.uncached, {}),
+        # Cached for the process; loaded here so its queries are not counted as the requests page's
+        ("editor: reference lookups", lookups, {}),
+        ("editor: requests page", session_store.sessions_page.uncached, {"status": "requests"}),
+        ("editor: confirmed by campus", session_store.count_sessions.uncached, {"status": "confirmed", "campus": "Elgin"}),
+        ("editor: confirmed by librarian", session_store.count_sessions.uncached, {"status": "confirmed", "librarian": "Cassidy Reid"}),
+        ("editor: requests this semester", session_store.count_sessions.uncached, {"status": "requests", "semester": current_semester()}),
+    ]
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        for label, func, kwargs in workload:
+            current[0] = label
+            func(**kwargs)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return captured
+
+
+def check(engine):
+    """Return (query label, plan detail) rows from SQLite's EXPLAIN QUERY PLAN."""
+    if engine.dialect.name != "sqlite":
+        raise RuntimeError("Query plan check is only implemented for SQLite")
+    plans = []
+    with engine.connect() as conn:
+        for label, statement, parameters in _capture_queries(engine):
+            rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+            plans.extend((label, row[-1]) for row in rows)
+    return plans
+
+
+def main():
+    from database import engine, init_db
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=["upgrade", "status", "check"])
+    args = parser.parse_args()
+
+    if args.command == "upgrade":
+        applied = init_db(engine)
+        print(f"Applied migrations: {applied}" if applied else "Database is up to date.")
+    elif args.command == "status":
+        done = applied_versions(engine)
+        for version, description, _ in MIGRATIONS:
+            print(f"{version:>4}  {'applied' if version in done else 'pending':8}  {description}")
+    else:
+        init_db(engine)
+        for label, detail in check(engine):
+            print(f"{label:35}  {detail}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""Queued email notifications for new instruction requests.
+
+ilform.py writes a NotificationOutbox row in the same transaction as the
+request; a background worker, started by main.py with the app, delivers
+pending rows over one reused SMTP connection, retrying failures with
+exponential backoff. Each row is claimed with a conditional UPDATE before
+it is sent, so the app's worker and ``notifications.py --once`` never send
+the same email twice.
+
+To try it against a local debugging server::
+
+    python -m smtpd -n -c DebuggingServer localhost:1025   # Python <= 3.11
+    ACC_IL_SMTP_SERVER=localhost ACC_IL_SMTP_PORT=1025 ACC_IL_SMTP_STARTTLS=0 python notifications.py --once
+"""
+import argparse
+import logging
+import os
+import smtplib
+import threading
+from datetime import datetime, timedelta
+from email.mime.text import MIMEText
+import streamlit as st
+from sqlalchemy import select, update, and_
+from database import Session, NotificationOutbox, init_db
+
+logger = logging.getLogger(__name__)
+
+# --- CONFIG ---
+
+# Map campuses to email addresses
+campus_email_map = {
+    "Highland": "cassidy.reid@austincc.edu",
+    "Hays": "cassidy.reid@austincc.edu",
+    "Elgin": "cassidy.reid@austincc.edu",
+    "Cypress Creek": "cassidy.reid@austincc.edu",
+    "Eastview": "cassidy.reid@austincc.edu",
+    "Round Rock": "cassidy.reid@austincc.edu",
+    # Add all needed campuses here
+}
+DEFAULT_RECIPIENT = "default_lib@yourcollege.edu"
+
+SMTP_SERVER = os.environ.get("ACC_IL_SMTP_SERVER", "smtp.austincc.edu")
+SMTP_PORT = int(os.environ.get("ACC_IL_SMTP_PORT", "587"))
+SMTP_USERNAME = os.environ.get("ACC_IL_SMTP_USERNAME")
+SMTP_PASSWORD = os.environ.get("ACC_IL_SMTP_PASSWORD")
+SMTP_STARTTLS = os.environ.get("ACC_IL_SMTP_STARTTLS", "1") == "1"
+FROM_EMAIL = "noreply@austincc.edu"
+
+BATCH_SIZE = 20
+MAX_ATTEMPTS = 6
+RETRY_BASE_SECONDS = 30  # doubled after every failed attempt
+POLL_SECONDS = 10
+# A row left 'sending' this long (the sender died mid-send) is due again
+CLAIM_TIMEOUT_SECONDS = 600
+
+
+def request_notification(slos, **fields):
+    """Build the outbox row announcing a new request; the caller adds it to its transaction."""
+    campus = fields.get('campus')
+    body = f"""New Instruction Session Requested:
+
+Name: {fields.get('first')} {fields.get('last')}
+Email: {fields.get('email')}
+Campus: {campus}
+Type: {fields.get('type')}
+Requested Dates: {fields.get('date_1')} or {fields.get('date_2')}
+Course: {fields.get('course_code')}-{fields.get('course_number')}
+Requested SLOs: {', '.join(slos)}
+Requested Librarian: {fields.get('librarian_presenter')}
+
+Please review this request in the system."""
+
+    now = datetime.now()
+    return NotificationOutbox(
+        recipient=campus_email_map.get(campus, DEFAULT_RECIPIENT),
+        subject=f"New Library Instruction Request - {campus}",
+        body=body,
+        status='pending',
+        attempts=0,
+        next_attempt_at=now,
+        created_at=now,
+    )
+
+
+class SMTPConnection:
+    """One long-lived SMTP connection, reopened only when the server drops it."""
+
+    def __init__(self):
+        self._server = None
+
+    def get(self):
+        if self._server is not None:
+            try:
+                if self._server.noop()[0] == 250:
+                    return self._server
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.close()
+
+        server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT, timeout=30)
+        if SMTP_STARTTLS:
+            server.starttls()
+        if SMTP_USERNAME:
+            server.login(SMTP_USERNAME, SMTP_PASSWORD)
+        self._server = server
+        return server
+
+    def close(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+        self._server = None
+
+
+def _to_message(row):
+    msg = MIMEText(row.body)
+    msg['Subject'] = row.subject
+    msg['From'] = FROM_EMAIL
+    msg['To'] = row.recipient
+    return msg
+
+
+def _due(now):
+    return and_(
+        NotificationOutbox.status.in_(('pending', 'sending')),
+        NotificationOutbox.next_attempt_at <= now,
+    )
+
+
+def _claim(db_session, row_id, now):
+    """Mark a due row as being sent. False if another worker claimed it first."""
+    result = db_session.execute(
+        update(NotificationOutbox)
+        .where(NotificationOutbox.id == row_id, _due(now))
+        .values(
+            status='sending',
+            attempts=NotificationOutbox.attempts + 1,
+            next_attempt_at=now + timedelta(seconds=CLAIM_TIMEOUT_SECONDS),
+        )
+    )
+    db_session.commit()
+    return result.rowcount == 1
+
+
+def deliver_pending(connection, batch_size=BATCH_SIZE):
+    """Send one batch of due messages. Returns (sent, failed) counts.
+
+    Rows are claimed and settled in their own short transactions, so the
+    database is not locked while the SMTP server is being talked to.
+    """
+    now = datetime.now()
+    sent = failed = 0
+    db_session = Session()
+    try:
+        due = db_session.scalars(
+            select(NotificationOutbox.id).where(_due(now)).order_by(NotificationOutbox.id).limit(batch_size)
+        ).all()
+        for row_id in due:
+            if not _claim(db_session, row_id, now):
+                continue
+            row = db_session.get(NotificationOutbox, row_id)
+            try:
+                connection.get().send_message(_to_message(row))
+            except (smtplib.SMTPException, OSError) as e:
+                connection.close()
+                row.last_error = str(e)
+                if row.attempts >= MAX_ATTEMPTS:
+                    row.status = 'failed'
+                else:
+                    row.status = 'pending'
+                    row.next_attempt_at = now + timedelta(seconds=RETRY_BASE_SECONDS * 2 ** (row.attempts - 1))
+                db_session.commit()
+                failed += 1
+                if isinstance(e, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError)):
+                    break  # server unreachable; leave the rest of the batch for the next pass
+            else:
+                row.status = 'sent'
+                row.sent_at = datetime.now()
+                row.last_error = None
+                db_session.commit()
+                sent += 1
+    finally:
+        db_session.close()
+    return sent, failed
+
+
+class OutboxWorker(threading.Thread):
+    """Daemon thread that drains the outbox, waking early when a new message is queued."""
+
+    def __init__(self, poll_seconds=POLL_SECONDS):
+        super().__init__(name="notification-outbox", daemon=True)
+        self.poll_seconds = poll_seconds
+        self.connection = SMTPConnection()
+        self._wake = threading.Event()
+
+    def wake(self):
+        self._wake.set()
+
+    def run(self):
+        while True:
+            try:
+                sent, _ = deliver_pending(self.connection)
+            except Exception:  # keep the worker alive through database hiccups
+                logger.exception("Notification worker error")
+                sent = 0
+            # Keep draining while full batches are going out
+            if sent < BATCH_SIZE:
+                self._wake.wait(self.poll_seconds)
+                self._wake.clear()
+
+
+@st.cache_resource
+def start_worker():
+    """Start the process-wide outbox worker once and return it (main.py calls this on startup)."""
+    worker = OutboxWorker()
+    worker.start()
+    return worker
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deliver queued notification emails.")
+    parser.add_argument("--once", action="store_true", help="send one batch and exit")
+    args = parser.parse_args()
+    init_db()
+
+    if args.once:
+        connection = SMTPConnection()
+        sent, failed = deliver_pending(connection)
+        connection.close()
+        print(f"Sent {sent}, failed {failed}.")
+    else:
+        worker = OutboxWorker()
+        worker.start()
+        worker.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""Opt-in timing of SQL statements and page sections.
+
+Set ACC_IL_PROFILE=1 to turn it on. main.py then installs SQLAlchemy event
+hooks on the engine, times every rerun and shows a Debug panel in the
+sidebar with the rerun's section timings, its slowest statements and the
+recent reruns, plus a JSON download. With ACC_IL_PROFILE_LOG set to a file
+path each rerun is also appended to it as one JSON line.
+
+Pages mark the parts worth timing with::
+
+    with profiling.section("Confirmed sessions"):
+        ...
+
+which costs nothing when profiling is off.
+"""
+import contextlib
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+ENABLED = os.environ.get("ACC_IL_PROFILE", "").lower() in ("1", "true", "yes")
+LOG_PATH = os.environ.get("ACC_IL_PROFILE_LOG")
+HISTORY_SIZE = 50
+SLOWEST_SHOWN = 10
+STATEMENT_CHARS = 300
+
+# The rerun being recorded by the current script thread, if any
+_local = threading.local()
+_history = deque(maxlen=HISTORY_SIZE)
+_history_lock = threading.Lock()
+
+
+def enabled():
+    return ENABLED
+
+
+def _current():
+    return getattr(_local, "run", None)
+
+
+class _CountingCursor:
+    """DBAPI cursor proxy that counts the rows and time spent fetching a SELECT's results."""
+
+    def __init__(self, cursor, record):
+        self._cursor = cursor
+        self._record = record
+
+    def _fetch(self, method, *args):
+        started = time.perf_counter()
+        rows = getattr(self._cursor, method)(*args)
+        self._record["fetch_seconds"] += time.perf_counter() - started
+        if method == "fetchone":
+            self._record["rows"] += rows is not None
+        else:
+            self._record["rows"] += len(rows)
+        return rows
+
+    def fetchone(self):
+        return self._fetch("fetchone")
+
+    def fetchmany(self, *args):
+        return self._fetch("fetchmany", *args)
+
+    def fetchall(self):
+        return self._fetch("fetchall")
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current() is not None:
+        context._profile_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    run = _current()
+    started = getattr(context, "_profile_started", None)
+    if run is None or started is None:
+        return
+    record = {
+        "statement": " ".join(statement.split())[:STATEMENT_CHARS],
+        "seconds": time.perf_counter() - started,
+        "fetch_seconds": 0.0,
+        "rows": 0,
+        "section": run["open_sections"][-1] if run["open_sections"] else None,
+    }
+    if cursor.description is None:
+        record["rows"] = max(cursor.rowcount, 0)
+    else:
+        # The result object is built from context.cursor right after this hook
+        context.cursor = _CountingCursor(cursor, record)
+    run["queries"].append(record)
+
+
+def install(engine):
+    """Attach the statement hooks to an engine (once per process)."""
+    from sqlalchemy import event
+
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def start_run(page):
+    """Begin recording a rerun on the calling thread."""
+    if not ENABLED:
+        return
+    _local.run = {
+        "page": page,
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "started": time.perf_counter(),
+        "sections": [],
+        "open_sections": [],
+        "queries": [],
+    }
+
+
+def finish_run():
+    """Stop recording, store the rerun in the history and return its summary (None when off)."""
+    run = _current()
+    if run is None:
+        return None
+    _local.run = None
+    summary = {
+        "page": run["page"],
+        "started_at": run["started_at"],
+        "seconds": time.perf_counter() - run["started"],
+        "sql_seconds": sum(query["seconds"] + query["fetch_seconds"] for query in run["queries"]),
+        "statements": len(run["queries"]),
+        "sections": run["sections"],
+        "queries": run["queries"],
+    }
+    with _history_lock:
+        _history.append(summary)
+    if LOG_PATH:
+        with open(LOG_PATH, "a") as handle:
+            handle.write(json.dumps(summary) + "\n")
+    return summary
+
+
+@contextlib.contextmanager
+def section(name):
+    """Time a block of a page as one named section of the current rerun."""
+    run = _current()
+    if run is None:
+        yield
+        return
+    # Listed in start order so nested sections follow their parent
+    timing = {"section": name, "depth": len(run["open_sections"])}
+    run["sections"].append(timing)
+    run["open_sections"].append(name)
+    started = time.perf_counter()
+    queries_before = len(run["queries"])
+    try:
+        yield
+    finally:
+        run["open_sections"].pop()
+        queries = run["queries"][queries_before:]
+        timing["seconds"] = time.perf_counter() - started
+        timing["sql_seconds"] = sum(query["seconds"] + query["fetch_seconds"] for query in queries)
+        timing["statements"] = len(queries)
+
+
+def history():
+    with _history_lock:
+        return list(_history)
+
+
+def export_json():
+    """The recorded reruns, newest last, as a JSON document."""
+    return json.dumps({"reruns": history()}, indent=2)
+
+
+def render_panel(summary):
+    """Sidebar panel for the rerun that just finished and the ones before it."""
+    import pandas as pd
+    import streamlit as st
+
+    with st.sidebar.expander("Debug: performance"):
+        st.write(
+            f"Last rerun of **{summary['page']}**: {summary['seconds'] * 1000:.0f} ms, "
+            f"{summary['statements']} SQL statements taking {summary['sql_seconds'] * 1000:.0f} ms."
+        )
+        if summary["sections"]:
+            sections = pd.DataFrame(summary["sections"])
+            sections["section"] = ["  " * depth + name for depth, name in zip(sections["depth"], sections["section"])]
+            st.dataframe(sections.drop(columns=["depth"]), hide_index=True)
+        if summary["queries"]:
+            slowest = sorted(summary["queries"], key=lambda query: query["seconds"] + query["fetch_seconds"], reverse=True)
+            st.write("Slowest statements:")
+            st.dataframe(pd.DataFrame(slowest[:SLOWEST_SHOWN]), hide_index=True)
+
+        runs = history()
+        st.write("Recent reruns:")
+        st.dataframe(
+            pd.DataFrame([
+                {key: run[key] for key in ("started_at", "page", "seconds", "sql_seconds", "statements")}
+                for run in reversed(runs)
+            ]),
+            hide_index=True,
+        )
+        st.download_button("Download JSON", export_json(), file_name="profile.json", mime="application/json")
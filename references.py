@@ -0,0 +1,231 @@
+"""Campus and librarian reference data.
+
+The campuses, librarians and librarian_campuses tables are seeded once
+from campuses.py and librarians.py by a migration; after that they are the
+source of truth and can be changed without a redeploy::
+
+    python references.py list
+    python references.py add-campus "Leander"
+    python references.py add-librarian "Jane Doe" --title "Faculty Librarian" --campus Leander --campus Elgin
+    python references.py retire-librarian "Jane Doe"
+
+Pages read names, ids and coverage through lookups(), which is cached
+until the next write (or the cache TTL, for changes made by this CLI).
+"""
+import argparse
+from sqlalchemy import select, insert, update, delete
+from database import engine, init_db, Campus, Librarian, LibrarianCampus, InstructionSession
+from cache import cached_resource, bump_data_version
+
+
+class ReferenceData:
+    """Name <-> id maps and coverage for campuses and librarians."""
+
+    def __init__(self, campuses, librarians, coverage):
+        # campuses/librarians are (id, name, active) rows, coverage (librarian id, campus id) pairs
+        self.campus_ids = {name: campus_id for campus_id, name, _ in campuses}
+        self.campus_by_id = {campus_id: name for campus_id, name, _ in campuses}
+        self.librarian_ids = {name: librarian_id for librarian_id, name, _ in librarians}
+        self.librarian_by_id = {librarian_id: name for librarian_id, name, _ in librarians}
+        self.active_campuses = sorted(name for _, name, active in campuses if active)
+        self.active_librarians = sorted(name for _, name, active in librarians if active)
+        # Case-insensitive matching for imports
+        self.campus_by_lower = {name.lower(): name for name in self.campus_ids}
+        self.librarian_by_lower = {name.lower(): name for name in self.librarian_ids}
+
+        self.librarian_campuses = {name: [] for name in self.librarian_ids}
+        self.campus_librarians = {name: [] for name in self.campus_ids}
+        active_librarians = set(self.active_librarians)
+        for librarian_id, campus_id in coverage:
+            librarian, campus = self.librarian_by_id[librarian_id], self.campus_by_id[campus_id]
+            self.librarian_campuses[librarian].append(campus)
+            if librarian in active_librarians:
+                self.campus_librarians[campus].append(librarian)
+
+
+@cached_resource
+def lookups():
+    """The current reference data (shared, read-only)."""
+    with engine.connect() as conn:
+        campuses = conn.execute(select(Campus.id, Campus.name, Campus.active)).all()
+        librarians = conn.execute(select(Librarian.id, Librarian.name, Librarian.active)).all()
+        coverage = conn.execute(
+            select(LibrarianCampus.librarian_id, LibrarianCampus.campus_id)
+            .order_by(LibrarianCampus.librarian_id, LibrarianCampus.campus_id)
+        ).all()
+    return ReferenceData(campuses, librarians, coverage)
+
+
+def campus_names():
+    """Active campus names, sorted."""
+    return lookups().active_campuses
+
+
+def librarian_names():
+    """Active librarian names, sorted."""
+    return lookups().active_librarians
+
+
+def campus_id(name):
+    return lookups().campus_ids.get(name)
+
+
+def librarian_id(name):
+    return lookups().librarian_ids.get(name)
+
+
+def librarians_for_campus(campus):
+    """Active librarians covering the campus, sorted."""
+    return sorted(lookups().campus_librarians.get(campus, []))
+
+
+def with_reference_ids(fields, data=None):
+    """Copy of session fields with campus_id/librarian_id set from any campus/librarian_presenter names."""
+    fields = dict(fields)
+    data = data or lookups()
+    if 'campus' in fields:
+        fields['campus_id'] = data.campus_ids.get(fields['campus'])
+    if 'librarian_presenter' in fields:
+        fields['librarian_id'] = data.librarian_ids.get(fields['librarian_presenter'])
+    return fields
+
+
+# --- SEEDING AND MAINTENANCE ---
+
+def _split_coverage(label):
+    # librarians.py writes e.g. 'High Schools - In-Person' for in-person coverage of a campus
+    campus, _, note = label.partition(' - ')
+    return campus, note or None
+
+
+def _ensure_campus(conn, name, active=True):
+    existing = conn.execute(select(Campus.id).where(Campus.name == name)).scalar()
+    if existing is not None:
+        return existing
+    return conn.execute(insert(Campus).values(name=name, active=active).returning(Campus.id)).scalar_one()
+
+
+def _ensure_librarian(conn, name, title=None, active=True):
+    existing = conn.execute(select(Librarian.id).where(Librarian.name == name)).scalar()
+    if existing is not None:
+        return existing
+    return conn.execute(
+        insert(Librarian).values(name=name, title=title, active=active).returning(Librarian.id)
+    ).scalar_one()
+
+
+def _set_coverage(conn, librarian, campuses):
+    conn.execute(delete(LibrarianCampus).where(LibrarianCampus.librarian_id == librarian))
+    rows = {}
+    for label in campuses:
+        campus, note = _split_coverage(label)
+        rows[campus] = {'librarian_id': librarian, 'campus_id': _ensure_campus(conn, campus), 'note': note}
+    if rows:
+        conn.execute(insert(LibrarianCampus), list(rows.values()))
+
+
+def backfill_session_ids(conn):
+    """Set campus_id/librarian_id on sessions from their stored names where missing."""
+    conn.execute(
+        update(InstructionSession)
+        .where(InstructionSession.campus_id.is_(None), InstructionSession.campus.is_not(None))
+        .values(campus_id=select(Campus.id).where(Campus.name == InstructionSession.campus).scalar_subquery())
+    )
+    conn.execute(
+        update(InstructionSession)
+        .where(InstructionSession.librarian_id.is_(None), InstructionSession.librarian_presenter.is_not(None))
+        .values(librarian_id=(
+            select(Librarian.id).where(Librarian.name == InstructionSession.librarian_presenter).scalar_subquery()
+        ))
+    )
+
+
+def seed(conn):
+    """Load campuses.py and librarians.py into empty reference tables and link existing sessions.
+
+    Names found on sessions but missing from the lists are added as inactive,
+    so every stored session keeps a key.
+    """
+    from campuses import campus_list
+    from librarians import librarian_list
+
+    if conn.execute(select(Librarian.id).limit(1)).first() is None:
+        for campus in campus_list:
+            _ensure_campus(conn, campus['name'])
+        for lib in librarian_list:
+            _set_coverage(conn, _ensure_librarian(conn, lib['name'], lib['title']), lib['campus'])
+
+    stored_campuses = select(InstructionSession.campus).where(InstructionSession.campus.is_not(None)).distinct()
+    for (name,) in conn.execute(stored_campuses).all():
+        _ensure_campus(conn, name, active=False)
+    stored_librarians = (
+        select(InstructionSession.librarian_presenter)
+        .where(InstructionSession.librarian_presenter.is_not(None))
+        .distinct()
+    )
+    for (name,) in conn.execute(stored_librarians).all():
+        _ensure_librarian(conn, name, active=False)
+
+    backfill_session_ids(conn)
+
+
+def add_campus(name):
+    with engine.begin() as conn:
+        campus = _ensure_campus(conn, name)
+        conn.execute(update(Campus).where(Campus.id == campus).values(active=True))
+        backfill_session_ids(conn)
+    bump_data_version()
+
+
+def add_librarian(name, title=None, campuses=()):
+    """Add a librarian, or reactivate one and replace their title and coverage."""
+    with engine.begin() as conn:
+        librarian = _ensure_librarian(conn, name, title)
+        conn.execute(update(Librarian).where(Librarian.id == librarian).values(title=title, active=True))
+        _set_coverage(conn, librarian, campuses)
+        backfill_session_ids(conn)
+    bump_data_version()
+
+
+def retire(model, name):
+    """Hide a campus or librarian from the pickers; their sessions are unchanged."""
+    with engine.begin() as conn:
+        found = conn.execute(update(model).where(model.name == name).values(active=False)).rowcount
+    if not found:
+        raise ValueError(f"Not found: {name!r}")
+    bump_data_version()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage campus and librarian reference data.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list")
+    add_campus_parser = commands.add_parser("add-campus")
+    add_campus_parser.add_argument("name")
+    add_librarian_parser = commands.add_parser("add-librarian")
+    add_librarian_parser.add_argument("name")
+    add_librarian_parser.add_argument("--title")
+    add_librarian_parser.add_argument("--campus", action="append", default=[],
+                                      help="repeat for each campus covered, e.g. 'High Schools - In-Person'")
+    for command in ("retire-campus", "retire-librarian"):
+        commands.add_parser(command).add_argument("name")
+    args = parser.parse_args()
+    init_db()
+
+    if args.command == "add-campus":
+        add_campus(args.name)
+    elif args.command == "add-librarian":
+        add_librarian(args.name, args.title, args.campus)
+    elif args.command == "retire-campus":
+        retire(Campus, args.name)
+    elif args.command == "retire-librarian":
+        retire(Librarian, args.name)
+
+    data = lookups.uncached()
+    print("Campuses:", ", ".join(data.active_campuses))
+    for name in data.active_librarians:
+        print(f"{name}: {', '.join(data.librarian_campuses[name]) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import pandas as pd
+from sqlalchemy import select, func, false, true
+from database import engine, InstructionSession, SessionSummary, SloSummary
+from cache import cached
+from semesters import semester_bounds
+
+SESSION_TYPES = ['In-Person', 'Asynchronous', 'Synchronous']
+LIST_PAGE_SIZE = 50
+
+
+def in_semester(semester, semester_column=SessionSummary.semester):
+    """Rows (summary rows or sessions) filed under the semester, or all of them without a semester.
+
+    Counts and lists share this predicate, so they always agree.
+    """
+    if not semester:
+        return true()
+    semester_bounds(semester)  # raises ValueError for a malformed name
+    return semester_column == semester
+
+
+def _frame(stmt, columns):
+    """Run a query and return its (small) result set as a DataFrame."""
+    with engine.connect() as conn:
+        rows = conn.execute(stmt).all()
+    return pd.DataFrame([tuple(row) for row in rows], columns=columns)
+
+
+def _listed(canceled):
+    # 'canceled' is NOT NULL, so a plain equality keeps the filter index friendly
+    return InstructionSession.canceled == (true() if canceled else false())
+
+
+def _session_page(canceled, semester, page, page_size):
+    stmt = (
+        select(InstructionSession.__table__)
+        .where(_listed(canceled), in_semester(semester, InstructionSession.semester))
+        .order_by(InstructionSession.id)
+        .limit(page_size)
+        .offset((max(page, 1) - 1) * page_size)
+    )
+    with engine.connect() as conn:
+        return pd.read_sql(stmt, conn)
+
+
+@cached
+def confirmed_sessions(semester=None, page=1, page_size=LIST_PAGE_SIZE):
+    """One page of non-canceled sessions (of one semester), filtered and windowed in SQL."""
+    return _session_page(False, semester, page, page_size)
+
+
+@cached
+def canceled_sessions(semester=None, page=1, page_size=LIST_PAGE_SIZE):
+    """One page of canceled sessions (of one semester), filtered and windowed in SQL."""
+    return _session_page(True, semester, page, page_size)
+
+
+@cached
+def listed_count(canceled, semester=None):
+    """Sessions that confirmed_sessions() (or, if canceled, canceled_sessions()) pages through.
+
+    Counted from the working table, so archived sessions are left out as they are from the listings.
+    """
+    stmt = select(func.count()).where(_listed(canceled), in_semester(semester, InstructionSession.semester))
+    with engine.connect() as conn:
+        return conn.execute(stmt).scalar_one()
+
+
+# The rollups below read the precomputed summary tables maintained by
+# summaries.py, never the raw session rows.
+
+@cached
+def canceled_count(semester=None):
+    stmt = select(func.coalesce(func.sum(SessionSummary.canceled), 0)).where(in_semester(semester))
+    with engine.connect() as conn:
+        return conn.execute(stmt).scalar_one()
+
+
+def _counts_by(column, label, semester):
+    total = func.sum(SessionSummary.sessions)
+    stmt = (
+        select(column, total)
+        .where(column != '', in_semester(semester))
+        .group_by(column)
+        .having(total > 0)
+        .order_by(total.desc(), column)
+    )
+    return _frame(stmt, [label, 'Total Sessions'])
+
+
+@cached
+def sessions_by_campus(semester=None):
+    return _counts_by(SessionSummary.campus, 'Campus', semester)
+
+
+@cached
+def sessions_by_librarian(semester=None):
+    return _counts_by(SessionSummary.librarian, 'Librarian', semester)
+
+
+@cached
+def librarian_type_breakdown(semester=None):
+    """Librarian x session type pivot with a Total column."""
+    total = func.sum(SessionSummary.sessions)
+    stmt = (
+        select(SessionSummary.librarian, SessionSummary.type, total)
+        .where(SessionSummary.librarian != '', SessionSummary.type != '', in_semester(semester))
+        .group_by(SessionSummary.librarian, SessionSummary.type)
+        .having(total > 0)
+    )
+    counts = _frame(stmt, ['Librarian', 'type', 'count'])
+    type_counts = counts.pivot_table(index='Librarian', columns='type', values='count', aggfunc='sum', fill_value=0)
+
+    for expected_type in SESSION_TYPES:
+        if expected_type not in type_counts.columns:
+            type_counts[expected_type] = 0
+
+    type_counts['Total'] = type_counts[SESSION_TYPES].sum(axis=1)
+    type_counts.columns.name = None
+    return type_counts.reset_index()
+
+
+@cached
+def sessions_by_month(semester=None):
+    """Monthly session and student totals in calendar order followed by a Year to Date (YTD) row.
+
+    With a semester only its months are listed and the last row is the semester total.
+    """
+    total = func.sum(SessionSummary.sessions)
+    stmt = (
+        select(SessionSummary.month, total, func.sum(SessionSummary.students))
+        .where(SessionSummary.month != '', in_semester(semester))
+        .group_by(SessionSummary.month)
+        .having(total > 0)
+        .order_by(SessionSummary.month)
+    )
+    month_counts = _frame(stmt, ['Month', 'Total Sessions', 'Students Reached'])
+    month_counts['Month'] = pd.to_datetime(month_counts['Month'], format='%Y-%m').dt.strftime('%B %Y')
+
+    ytd_row = pd.DataFrame([{
+        'Month': f'{semester} total' if semester else 'Year to Date (YTD)',
+        'Total Sessions': month_counts['Total Sessions'].sum(),
+        'Students Reached': month_counts['Students Reached'].sum(),
+    }])
+    return pd.concat([month_counts, ytd_row], ignore_index=True)
+
+
+@cached
+def slo_frequency(semester=None):
+    """How many non-canceled sessions addressed each SLO."""
+    total = func.sum(SloSummary.sessions)
+    stmt = select(SloSummary.slo, total).where(in_semester(semester, SloSummary.semester)).group_by(SloSummary.slo).having(total > 0).order_by(total.desc())
+    return _frame(stmt, ['SLO', 'Sessions'])
@@ -0,0 +1,199 @@
+"""Librarian availability, double-booking checks and assignment proposals.
+
+Confirmed sessions are loaded once per data version into an in-memory
+index of busy intervals per librarian and day, so availability lookups
+are dictionary hits plus a scan of that day's (few) bookings.
+
+Sessions without a start time block the librarian's whole day, since the
+request form does not collect times. Asynchronous sessions never block.
+"""
+import bisect
+import re
+from collections import defaultdict
+from sqlalchemy import select, false
+from database import engine, InstructionSession
+from references import librarian_names, librarians_for_campus
+from cache import cached, cached_resource
+from session_store import filter_clauses
+
+DEFAULT_LENGTH_MINUTES = 60
+WHOLE_DAY = (0, 24 * 60)
+NON_BLOCKING_TYPES = {'Asynchronous'}
+
+
+def parse_length(value):
+    """Minutes from free-text lengths such as '50', '50 min', '1.5 hours' or '1:15'."""
+    if value is None:
+        return DEFAULT_LENGTH_MINUTES
+    text = str(value).strip().lower()
+    match = re.fullmatch(r'(\d+):(\d{2})', text)
+    if match:
+        return int(match.group(1)) * 60 + int(match.group(2))
+    match = re.match(r'(\d+(?:\.\d+)?)\s*(h|hr|hrs|hour|hours)?\b', text)
+    if not match:
+        return DEFAULT_LENGTH_MINUTES
+    amount = float(match.group(1))
+    return int(amount * 60) if match.group(2) else int(amount)
+
+
+def interval(start_time=None, length=None):
+    """(start, end) in minutes after midnight; the whole day when the start time is unknown."""
+    if start_time is None:
+        return WHOLE_DAY
+    start = start_time.hour * 60 + start_time.minute
+    return start, start + parse_length(length)
+
+
+def librarians_for(campus=None):
+    """Active librarians covering the campus (everyone for sessions without a campus)."""
+    if not campus:
+        return librarian_names()
+    return librarians_for_campus(campus)
+
+
+class ScheduleIndex:
+    """Busy intervals keyed by librarian and day, each day's list sorted by start."""
+
+    def __init__(self, bookings=()):
+        # librarian -> day -> sorted [(start, end, session_id)]
+        self._busy = defaultdict(lambda: defaultdict(list))
+        for librarian, day, start, end, session_id in bookings:
+            self.add(librarian, day, start, end, session_id)
+
+    def add(self, librarian, day, start, end, session_id=None):
+        bisect.insort(self._busy[librarian][day], (start, end, session_id))
+
+    def copy(self):
+        clone = ScheduleIndex()
+        for librarian, days in self._busy.items():
+            for day, intervals in days.items():
+                clone._busy[librarian][day] = list(intervals)
+        return clone
+
+    def conflicts(self, librarian, day, start=0, end=WHOLE_DAY[1]):
+        """Session ids booked for the librarian that overlap [start, end) on the day."""
+        days = self._busy.get(librarian)
+        intervals = days.get(day) if days else None
+        if not intervals:
+            return []
+        # Only bookings that start before `end` can overlap
+        candidates = intervals[:bisect.bisect_left(intervals, (end,))]
+        return [session_id for busy_start, busy_end, session_id in candidates if busy_end > start]
+
+    def is_free(self, librarian, day, start=0, end=WHOLE_DAY[1]):
+        return not self.conflicts(librarian, day, start, end)
+
+    def available(self, day, start_time=None, length=None, campus=None):
+        """Librarians covering the campus with nothing booked in the slot."""
+        start, end = interval(start_time, length)
+        return [name for name in librarians_for(campus) if self.is_free(name, day, start, end)]
+
+    def bookings_on(self, librarian, day):
+        days = self._busy.get(librarian)
+        return len(days.get(day, [])) if days else 0
+
+    def double_bookings(self):
+        """(librarian, day, first session id, second session id) for every overlapping pair."""
+        found = []
+        for librarian, days in self._busy.items():
+            for day, intervals in days.items():
+                for i, (start, end, session_id) in enumerate(intervals):
+                    for other_start, _, other_id in intervals[i + 1:]:
+                        if other_start >= end:
+                            break
+                        found.append((librarian, day, session_id, other_id))
+        return found
+
+
+@cached_resource
+def load_index():
+    """Index of confirmed, non-canceled, live sessions (shared until the next write)."""
+    stmt = select(
+        InstructionSession.id,
+        InstructionSession.librarian_presenter,
+        InstructionSession.date_of_session,
+        InstructionSession.time,
+        InstructionSession.length,
+        InstructionSession.type,
+    ).where(
+        InstructionSession.canceled == false(),
+        InstructionSession.date_of_session.is_not(None),
+        InstructionSession.librarian_presenter.is_not(None),
+    )
+    with engine.connect() as conn:
+        rows = conn.execute(stmt).all()
+
+    return ScheduleIndex(
+        (librarian, day, *interval(start_time, length), session_id)
+        for session_id, librarian, day, start_time, length, session_type in rows
+        if session_type not in NON_BLOCKING_TYPES
+    )
+
+
+@cached
+def pending_requests(**filters):
+    """Open (unconfirmed, not canceled) requests as dicts for propose_assignments (with their edit versions)."""
+    stmt = (
+        select(
+            InstructionSession.id,
+            InstructionSession.date_1,
+            InstructionSession.date_2,
+            InstructionSession.campus,
+            InstructionSession.librarian_presenter,
+            InstructionSession.type,
+            InstructionSession.time,
+            InstructionSession.length,
+            InstructionSession.version,
+        )
+        .where(
+            InstructionSession.date_of_session.is_(None),
+            InstructionSession.canceled == false(),
+            *filter_clauses(**filters),
+        )
+        .order_by(InstructionSession.id)
+    )
+    with engine.connect() as conn:
+        return [dict(row._mapping) for row in conn.execute(stmt)]
+
+
+def propose_assignments(index, requests):
+    """Propose a date and librarian for each request without double booking anyone.
+
+    requests are dicts as returned by pending_requests(). The requested
+    librarian and first-choice date are preferred; otherwise the least busy
+    librarian covering the campus is used. Proposals are booked into a copy
+    of the index as they are made, so a batch never collides with itself.
+    Returns one dict per request; 'librarian' and 'date' are None when
+    nobody is free on either requested date.
+    """
+    index = index.copy()
+    proposals = []
+    for request in sorted(requests, key=lambda r: (r['date_1'] is None, r['date_1'] or 0, r['id'])):
+        days = list(dict.fromkeys(day for day in (request['date_1'], request['date_2']) if day))
+        start, end = interval(request.get('time'), request.get('length'))
+        blocking = request.get('type') not in NON_BLOCKING_TYPES
+
+        def free(name, day):
+            return not blocking or index.is_free(name, day, start, end)
+
+        choice = None
+        requested = request.get('librarian_presenter')
+        if requested:
+            choice = next(((requested, day, "requested librarian") for day in days if free(requested, day)), None)
+        if choice is None:
+            for day in days:
+                candidates = [name for name in librarians_for(request.get('campus')) if free(name, day)]
+                if candidates:
+                    name = min(candidates, key=lambda candidate: (index.bookings_on(candidate, day), candidate))
+                    choice = (name, day, "covering librarian")
+                    break
+
+        if choice is None:
+            proposals.append({'id': request['id'], 'librarian': None, 'date': None,
+                              'reason': "no librarian free on the requested dates"})
+            continue
+        librarian, day, reason = choice
+        if blocking:
+            index.add(librarian, day, start, end, request['id'])
+        proposals.append({'id': request['id'], 'librarian': librarian, 'date': day, 'reason': reason})
+    return proposals
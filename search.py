@@ -0,0 +1,103 @@
+"""Full-text search over sessions.
+
+On SQLite an FTS5 index (session_search) covers the instructor, course,
+room, assessment and cancel reason text of every session. It is created by
+a migration and kept in sync by triggers on instruction_sessions, so no
+write path has to maintain it. Every search term is matched as a prefix
+and results are ranked with bm25. Other databases fall back to
+case-insensitive LIKE matching without ranking.
+"""
+import re
+from sqlalchemy import Table, Column, Integer, String, MetaData, select, and_, or_, func, literal_column, text
+from database import engine, InstructionSession
+from cache import cached
+
+SEARCH_COLUMNS = ['first', 'last', 'email', 'course_code', 'course_number', 'campus_room', 'assessment', 'canceled_reason']
+RESULT_LIMIT = 50
+# Titles people type in front of instructor names that are not stored with them
+IGNORED_TERMS = {'dr', 'prof', 'professor', 'mr', 'mrs', 'ms'}
+
+# Kept out of the models' metadata so create_all() never tries to build it
+session_search = Table('session_search', MetaData(), Column('rowid', Integer), Column('session_search', String))
+
+
+def create_index(conn):
+    """Create the FTS5 table and its sync triggers, then index existing sessions (SQLite only)."""
+    if engine.dialect.name != 'sqlite':
+        return
+    columns = ", ".join(SEARCH_COLUMNS)
+    new_values = ", ".join(f"new.{column}" for column in SEARCH_COLUMNS)
+    old_values = ", ".join(f"old.{column}" for column in SEARCH_COLUMNS)
+    statements = [
+        # External content: the index stores only tokens and reads text from instruction_sessions
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS session_search USING fts5({columns}, "
+        "content='instruction_sessions', content_rowid='id', prefix='2 3')",
+        f"CREATE TRIGGER IF NOT EXISTS session_search_insert AFTER INSERT ON instruction_sessions BEGIN "
+        f"INSERT INTO session_search (rowid, {columns}) VALUES (new.id, {new_values}); END",
+        f"CREATE TRIGGER IF NOT EXISTS session_search_delete AFTER DELETE ON instruction_sessions BEGIN "
+        f"INSERT INTO session_search (session_search, rowid, {columns}) VALUES ('delete', old.id, {old_values}); END",
+        # Only edits to indexed columns touch the index
+        f"CREATE TRIGGER IF NOT EXISTS session_search_update AFTER UPDATE OF {columns} ON instruction_sessions BEGIN "
+        f"INSERT INTO session_search (session_search, rowid, {columns}) VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO session_search (rowid, {columns}) VALUES (new.id, {new_values}); END",
+        "INSERT INTO session_search (session_search) VALUES ('rebuild')",
+    ]
+    for statement in statements:
+        conn.execute(text(statement))
+
+
+def terms(query):
+    """Words of a search box entry, lowercased, without punctuation or titles."""
+    words = re.findall(r'\w+', (query or '').lower())
+    return [word for word in words if word not in IGNORED_TERMS]
+
+
+def fts_query(query):
+    """FTS5 MATCH expression requiring every term as a prefix, e.g. '"engl"* AND "1301"*'."""
+    return " AND ".join(f'"{term}"*' for term in terms(query))
+
+
+def match_clause(query):
+    """WHERE clause limiting instruction_sessions to sessions matching every term."""
+    if engine.dialect.name == 'sqlite':
+        matches = select(session_search.c.rowid).where(literal_column('session_search').op('MATCH')(fts_query(query)))
+        return InstructionSession.id.in_(matches)
+    return and_(*(
+        or_(*(getattr(InstructionSession, column).ilike(f"%{term}%") for column in SEARCH_COLUMNS))
+        for term in terms(query)
+    ))
+
+
+@cached
+def search_sessions(query, limit=RESULT_LIMIT):
+    """Best matches for a search box entry as a DataFrame, most relevant first."""
+    import pandas as pd
+
+    columns = {
+        'ID': InstructionSession.id,
+        'Date Confirmed': InstructionSession.date_of_session,
+        'Date Requested 1': InstructionSession.date_1,
+        'First': InstructionSession.first,
+        'Last': InstructionSession.last,
+        'Course Code': InstructionSession.course_code,
+        'Course_Number': InstructionSession.course_number,
+        'Campus': InstructionSession.campus,
+        'Librarian': InstructionSession.librarian_presenter,
+        'Assessment': InstructionSession.assessment,
+        'Canceled': InstructionSession.canceled,
+    }
+    if not terms(query):
+        return pd.DataFrame(columns=list(columns))
+
+    if engine.dialect.name == 'sqlite':
+        stmt = (
+            select(*columns.values())
+            .join(session_search, session_search.c.rowid == InstructionSession.id)
+            .where(literal_column('session_search').op('MATCH')(fts_query(query)))
+            .order_by(func.bm25(literal_column('session_search')))
+        )
+    else:
+        stmt = select(*columns.values()).where(match_clause(query)).order_by(InstructionSession.id.desc())
+    with engine.connect() as conn:
+        rows = conn.execute(stmt.limit(limit)).all()
+    return pd.DataFrame(rows, columns=list(columns))
@@ -0,0 +1,81 @@
+from datetime import date, timedelta
+
+# (term, first month, last month) in calendar order
+SEMESTER_MONTHS = [
+    ("Spring", 1, 5),
+    ("Summer", 6, 7),
+    ("Fall", 8, 12),
+]
+
+
+def semester_for(value):
+    """Return the semester name (e.g. 'Fall 2025') a date falls in."""
+    if value is None:
+        return None
+    for term, first_month, last_month in SEMESTER_MONTHS:
+        if first_month <= value.month <= last_month:
+            return f"{term} {value.year}"
+    return None
+
+
+def session_semester(date_of_session, date_1):
+    """The semester a session is filed under: that of its session date, or of its first requested date until confirmed."""
+    return semester_for(date_of_session or date_1)
+
+
+def current_semester(today=None):
+    return semester_for(today or date.today())
+
+
+def is_closed(name, today=None):
+    """Whether a semester (None for no semester) ended before today."""
+    return bool(name) and semester_bounds(name)[1] < (today or date.today())
+
+
+def semester_bounds(name):
+    """Return the (first day, last day) of a semester name like 'Spring 2026'."""
+    term, year = name.rsplit(" ", 1)
+    year = int(year)
+    for candidate, first_month, last_month in SEMESTER_MONTHS:
+        if candidate == term:
+            if last_month == 12:
+                end = date(year, 12, 31)
+            else:
+                end = date(year, last_month + 1, 1) - timedelta(days=1)
+            return date(year, first_month, 1), end
+    raise ValueError(f"Unknown semester: {name}")
+
+
+def recent_semesters(count=6, today=None):
+    """Semester names newest first, starting with the next semester after today."""
+    today = today or date.today()
+    current = semester_for(today)
+    terms = [term for term, _, _ in SEMESTER_MONTHS]
+    term, year = current.rsplit(" ", 1)
+    index, year = terms.index(term) + 1, int(year)
+    if index == len(terms):
+        index, year = 0, year + 1
+
+    names = []
+    for _ in range(count):
+        names.append(f"{terms[index]} {year}")
+        index -= 1
+        if index < 0:
+            index, year = len(terms) - 1, year - 1
+    return names
+
+
+def academic_year_bounds(name):
+    """Return the (first day, last day) of an academic year like '2025-2026' (Fall through Summer)."""
+    first_year = int(name.split("-")[0])
+    fall_start, _ = semester_bounds(f"Fall {first_year}")
+    _, summer_end = semester_bounds(f"Summer {first_year + 1}")
+    return fall_start, summer_end
+
+
+def recent_academic_years(count=5, today=None):
+    """Academic year names newest first, starting with the current one."""
+    today = today or date.today()
+    fall_start, _ = semester_bounds(f"Fall {today.year}")
+    first_year = today.year if today >= fall_start else today.year - 1
+    return [f"{year}-{year + 1}" for year in range(first_year, first_year - count, -1)]
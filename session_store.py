@@ -0,0 +1,384 @@
+from datetime import datetime, date
+from sqlalchemy import select, func, and_, or_, false, true, type_coerce, String
+from collections import Counter
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.exc import StaleDataError
+from database import engine, Session, InstructionSession, InstructionSessionSLO
+from cache import cached
+import changes
+import profiling
+from semesters import semester_bounds, session_semester, is_closed
+from notifications import request_notification
+from references import lookups, with_reference_ids
+import search
+import summaries
+
+PAGE_SIZE = 25
+CANCELED_REASON = "Canceled via interface"
+
+# Row sets shown by the editor page
+STATUSES = ('requests', 'confirmed', 'canceled')
+
+
+class ConflictError(Exception):
+    """Sessions changed by someone else since the editor loaded them; nothing was saved."""
+
+    def __init__(self, session_ids):
+        self.session_ids = sorted(session_ids)
+        super().__init__(f"Sessions changed since they were loaded: {', '.join(map(str, self.session_ids))}")
+
+
+def parse_date(value):
+    if value is None or (isinstance(value, float) and value != value):  # NaN
+        return None
+    if isinstance(value, date):
+        return value
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, str):
+        for fmt in ("%Y-%m-%d", "%m/%d/%Y", "%m/%d/%y", "%d-%m-%Y"):
+            try:
+                return datetime.strptime(value, fmt).date()
+            except ValueError:
+                continue
+        return None
+    return None
+
+
+def format_date_for_db(value):
+    """Ensure date is stored in MM/DD/YYYY format as string."""
+    if isinstance(value, date):
+        return value.strftime("%m/%d/%Y")
+    return None
+
+
+# --- READS ---
+
+# Editor grid columns read straight from instruction_sessions. Dates are
+# fetched as their stored text and parsed a column at a time in _load_frame.
+FRAME_COLUMNS = {
+    'ID': InstructionSession.id,
+    'Date Requested 1': type_coerce(InstructionSession.date_1, String),
+    'Date Confirmed': type_coerce(InstructionSession.date_of_session, String),
+    'Campus': InstructionSession.campus,
+    'Librarian': InstructionSession.librarian_presenter,
+    'First': InstructionSession.first,
+    'Last': InstructionSession.last,
+    'Course Code': InstructionSession.course_code,
+    'Course_Number': InstructionSession.course_number,
+    'Type': InstructionSession.type,
+    'Number of Students': InstructionSession.number_of_students,
+    'Campus_Room': InstructionSession.campus_room,
+    'Assessment': InstructionSession.assessment,
+    'Canceled': InstructionSession.canceled,
+    'Canceled Reason': InstructionSession.canceled_reason,
+    'Version': InstructionSession.version,
+}
+
+
+def _dates(pd, values):
+    """Text dates -> (datetime64 Series, Series of date objects with None for missing)."""
+    parsed = pd.to_datetime(values, format='ISO8601', errors='coerce')
+    return parsed, parsed.dt.date.astype(object).where(parsed.notna(), None)
+
+
+def _load_frame(*clauses, limit=None, offset=0):
+    """Sessions matching clauses as an editor DataFrame, from two column-oriented queries.
+
+    One query reads the session columns, the other the SLOs of the same
+    sessions; neither builds ORM objects.
+    """
+    # pandas is only imported by the functions that build frames, so the
+    # request form (which never does) starts without loading it
+    import pandas as pd
+
+    sessions_stmt = select(*FRAME_COLUMNS.values()).where(*clauses).order_by(InstructionSession.id)
+    if limit is not None:
+        sessions_stmt = sessions_stmt.limit(limit).offset(offset)
+    slo_stmt = (
+        select(InstructionSessionSLO.session_id, InstructionSessionSLO.slo)
+        .where(InstructionSessionSLO.session_id.in_(sessions_stmt.with_only_columns(InstructionSession.id)))
+        .order_by(InstructionSessionSLO.session_id, InstructionSessionSLO.id)
+    )
+    with engine.connect() as conn, profiling.section("Load sessions (SQL)"):
+        rows = conn.execute(sessions_stmt).all()
+        slo_rows = conn.execute(slo_stmt).all() if rows else []
+    if not rows:
+        return pd.DataFrame()
+
+    with profiling.section("Build DataFrame"):
+        data = pd.DataFrame(rows, columns=list(FRAME_COLUMNS))
+        data['Date Requested 1'] = _dates(pd, data['Date Requested 1'])[1]
+        confirmed, data['Date Confirmed'] = _dates(pd, data['Date Confirmed'])
+
+        # SLO rows arrive ordered by session, so grouping them is a single pass
+        slos = {}
+        for session_id, slo in slo_rows:
+            slos.setdefault(session_id, []).append(slo)
+        data.insert(data.columns.get_loc('Type') + 1, 'SLOs', [slos.get(session_id, []) for session_id in data['ID']])
+
+        data['Canceled'] = data['Canceled'].astype(bool)
+        data['Day of Week'] = confirmed.dt.day_name()
+        return data
+
+
+def status_clause(status):
+    """WHERE clause for one of STATUSES."""
+    if status == 'requests':
+        return and_(InstructionSession.date_of_session.is_(None), InstructionSession.canceled == false())
+    if status == 'confirmed':
+        return and_(InstructionSession.date_of_session.is_not(None), InstructionSession.canceled == false())
+    if status == 'canceled':
+        return InstructionSession.canceled == true()
+    raise ValueError(f"Unknown status: {status}")
+
+
+def _date_between(start_date, end_date):
+    # Confirmed sessions are placed by their session date, open requests by their first requested date
+    session_date, requested_date = InstructionSession.date_of_session, InstructionSession.date_1
+    return or_(
+        session_date.between(start_date, end_date),
+        and_(session_date.is_(None), requested_date.between(start_date, end_date)),
+    )
+
+
+def filter_clauses(campus=None, librarian=None, semester=None, start_date=None, end_date=None, query=None):
+    """Translate the sidebar filters (and search box text) into SQL WHERE clauses."""
+    clauses = []
+    data = lookups()
+    # Names are matched through the reference tables so the indexed integer keys are used
+    if campus:
+        clauses.append(InstructionSession.campus_id == data.campus_ids.get(campus, -1))
+    if librarian:
+        clauses.append(InstructionSession.librarian_id == data.librarian_ids.get(librarian, -1))
+    if semester:
+        semester_bounds(semester)  # raises ValueError for a malformed name
+        clauses.append(InstructionSession.semester == semester)
+    if start_date or end_date:
+        clauses.append(_date_between(start_date or date.min, end_date or date.max))
+    if search.terms(query):
+        clauses.append(search.match_clause(query))
+    return clauses
+
+
+@cached
+def count_sessions(status, **filters):
+    stmt = (
+        select(func.count(InstructionSession.id))
+        .where(status_clause(status), *filter_clauses(**filters))
+    )
+    with Session() as db_session:
+        return db_session.execute(stmt).scalar_one()
+
+
+@cached
+def sessions_page(status, page=1, page_size=PAGE_SIZE, **filters):
+    """One page of sessions in a status, filtered and windowed in SQL."""
+    return _load_frame(
+        status_clause(status), *filter_clauses(**filters),
+        limit=page_size, offset=(max(page, 1) - 1) * page_size,
+    )
+
+
+def refresh_page(frame, seq, status, page_size=PAGE_SIZE, **filters):
+    """Bring a page from sessions_page(), read as of change seq, up to date.
+
+    Only the sessions changed since seq are re-read and merged in place.
+    Returns (frame, newest seq); frame is None when rows moved onto or off
+    the page, since then the page has to be loaded again.
+    """
+    import pandas as pd
+
+    latest, changed_ids = changes.changed_since(seq)
+    if not changed_ids:
+        return frame, latest
+    changed = _load_frame(InstructionSession.id.in_(changed_ids), status_clause(status), *filter_clauses(**filters))
+
+    loaded = set(frame['ID']) if not frame.empty else set()
+    matching = set(changed['ID']) if not changed.empty else set()
+    if (loaded & changed_ids) - matching:
+        return None, latest  # left the page's status or filters
+    added = matching - loaded
+    if added:
+        if frame.empty or min(added) < max(loaded):
+            return None, latest  # shifts the rows of this page
+        if len(frame) == page_size:
+            added = set()  # belong to a later page
+        elif len(frame) + len(added) > page_size:
+            return None, latest
+    if not matching & loaded and not added:
+        return frame, latest
+
+    kept = changed[changed['ID'].isin(loaded | added)]
+    merged = pd.concat([frame[~frame['ID'].isin(kept['ID'])], kept], ignore_index=True)
+    return merged.sort_values('ID', ignore_index=True), latest
+
+
+# Editor grid columns that map onto InstructionSession columns
+EDITABLE_COLUMNS = {
+    'Date Confirmed': 'date_of_session',
+    'Campus': 'campus',
+    'Librarian': 'librarian_presenter',
+    'Number of Students': 'number_of_students',
+    'Campus_Room': 'campus_room',
+    'Assessment': 'assessment',
+    'SLOs': 'slos',
+}
+
+
+def _editor_value(column, value):
+    """Normalize a grid cell so unchanged cells compare equal to the loaded data."""
+    import pandas as pd
+
+    if column == 'slos':
+        return list(value) if isinstance(value, (list, tuple)) or hasattr(value, 'tolist') else []
+    if value is None or pd.isna(value):
+        return None
+    if column == 'date_of_session':
+        return parse_date(value)
+    if column == 'number_of_students':
+        return int(value)
+    if isinstance(value, str) and value.strip() == '':
+        return None
+    return value
+
+
+def diff_frames(original, edited, columns):
+    """Return {session id: {model column: new value}} for cells that changed in a grid."""
+    updates = {}
+    original = original.set_index('ID')
+    for _, row in edited.iterrows():
+        session_id = int(row['ID'])
+        before = original.loc[session_id]
+        changes = {}
+        for label in columns:
+            column = EDITABLE_COLUMNS[label]
+            new_value = _editor_value(column, row[label])
+            if new_value != _editor_value(column, before[label]):
+                changes[column] = new_value
+        if changes:
+            updates[session_id] = changes
+    return updates
+
+
+# --- WRITES ---
+# Every write commits and then bumps the cache data version.
+
+def create_request(slos, notify=False, **fields):
+    """Insert a new session request from the form along with its SLOs.
+
+    With notify=True the notification email is queued in the same transaction.
+    """
+    db_session = Session()
+    try:
+        fields['semester'] = session_semester(fields.get('date_of_session'), fields.get('date_1'))
+        new_session = InstructionSession(**with_reference_ids(fields))
+        db_session.add(new_session)
+        db_session.flush()  # Get ID for SLO linking
+
+        for slo in slos:
+            db_session.add(InstructionSessionSLO(session_id=new_session.id, slo=slo))
+
+        summaries.apply_deltas(db_session, after=[dict(fields, slos=slos, canceled=False)])
+        seq = changes.record(db_session, [new_session.id], 'insert')
+
+        if notify:
+            notification = request_notification(slos, **fields)
+            notification.session_id = new_session.id
+            db_session.add(notification)
+
+        db_session.commit()
+        new_id = new_session.id
+    finally:
+        db_session.close()
+    changes.written(seq, stable=is_closed(fields['semester']))
+    return new_id
+
+
+def _replace_slos(session_to_update, slos):
+    """Make the session's SLO rows match the list, deleting and inserting only the differences."""
+    wanted = Counter(slos)
+    for row in list(session_to_update.slos):
+        if wanted[row.slo] > 0:
+            wanted[row.slo] -= 1
+        else:
+            session_to_update.slos.remove(row)  # delete-orphan removes the row
+    for slo_text in slos:
+        if wanted[slo_text] > 0:
+            wanted[slo_text] -= 1
+            session_to_update.slos.append(InstructionSessionSLO(slo=slo_text))
+
+
+def apply_changes(updates, canceled_ids=(), canceled_reason=CANCELED_REASON, expected_versions=None):
+    """Write a batch of edits in one transaction.
+
+    updates maps session id -> {model column: new value}; an 'slos' entry holds
+    the complete new SLO list. Sessions in canceled_ids are marked canceled.
+    expected_versions maps session id -> the version the editor loaded; if any
+    of those sessions has changed since, ConflictError is raised and nothing
+    is written. Returns the number of sessions written.
+    """
+    ids = set(updates) | set(canceled_ids)
+    if not ids:
+        return 0
+    expected_versions = expected_versions or {}
+
+    db_session = Session()
+    try:
+        sessions = (
+            db_session.query(InstructionSession)
+            .options(selectinload(InstructionSession.slos))
+            .filter(InstructionSession.id.in_(ids))
+            .all()
+        )
+        stale = [
+            session_to_update.id for session_to_update in sessions
+            if expected_versions.get(session_to_update.id, session_to_update.version) != session_to_update.version
+        ]
+        if stale:
+            raise ConflictError(stale)
+
+        before = [summaries.snapshot(session_to_update) for session_to_update in sessions]
+        for session_to_update in sessions:
+            values = with_reference_ids(updates.get(session_to_update.id, {}))
+            slos = values.pop('slos', None)
+            for column, value in values.items():
+                setattr(session_to_update, column, value)
+
+            if slos is not None:
+                _replace_slos(session_to_update, slos)
+
+            if session_to_update.id in canceled_ids:
+                session_to_update.canceled = True
+                session_to_update.canceled_reason = canceled_reason
+
+            session_to_update.semester = session_semester(session_to_update.date_of_session, session_to_update.date_1)
+
+            session_to_update.version = session_to_update.version + 1
+
+        try:
+            # The UPDATEs are issued as ... WHERE id = ? AND version = <loaded version>
+            db_session.flush()
+        except StaleDataError:
+            # Another writer committed between our read and our UPDATE
+            db_session.rollback()
+            raise ConflictError(ids)
+        after = [summaries.snapshot(session_to_update) for session_to_update in sessions]
+        summaries.apply_deltas(db_session, before, after)
+        # e.g. student counts entered after the term ended
+        edits_closed_semester = any(is_closed(row['semester']) for row in before + after)
+        written_ids = [session_to_update.id for session_to_update in sessions]
+        seqs = (
+            changes.record(db_session, [i for i in written_ids if i in canceled_ids], 'cancel'),
+            changes.record(db_session, [i for i in written_ids if i not in canceled_ids], 'update'),
+        )
+        db_session.commit()
+        written = len(sessions)
+    finally:
+        db_session.close()
+    changes.written(*seqs, stable=edits_closed_semester)
+    return written
+
+
+def cancel_session(session_id):
+    apply_changes({}, [session_id])
@@ -1,74 +1,24 @@
 import streamlit as st
 import pandas as pd
-from datetime import datetime, date
-from database import Session, InstructionSession, InstructionSessionSLO
-from librarians import librarian_list
-from campuses import campus_list
-from sqlalchemy.orm import joinedload
-
-def parse_date(value):
-    if value is None or (isinstance(value, float) and pd.isna(value)):
-        return None
-    if isinstance(value, date):
-        return value
-    if isinstance(value, datetime):
-        return value.date()
-    if isinstance(value, pd.Timestamp):
-        return value.date()
-    if isinstance(value, str):
-        for fmt in ("%Y-%m-%d", "%m/%d/%Y", "%m/%d/%y", "%d-%m-%Y"):
-            try:
-                return datetime.strptime(value, fmt).date()
-            except ValueError:
-                continue
-        return None
-    return None
-
-def format_date_for_db(value):
-    """Ensure date is stored in MM/DD/YYYY format as string."""
-    if isinstance(value, date):
-        return value.strftime("%m/%d/%Y")
-    return None
-
-def load_sessions():
-    db_session = Session()
-    sessions = db_session.query(InstructionSession).options(joinedload(InstructionSession.slos)).all()
-    db_session.close()
-    return sessions
-
-def cancel_session(session_id):
-    db_session = Session()
-    session_to_cancel = db_session.query(InstructionSession).filter_by(id=session_id).first()
-    if session_to_cancel:
-        session_to_cancel.canceled = True
-        session_to_cancel.canceled_reason = "Canceled via interface"
-        db_session.commit()
-    db_session.close()
+from session_store import count_sessions, sessions_page, refresh_page, diff_frames, apply_changes, ConflictError, CANCELED_REASON
+from semesters import recent_semesters, current_semester
+import references
+import profiling
+import changes
+from scheduling import load_index, pending_requests, propose_assignments
+from search import search_sessions
 
 def rerun():
     """Streamlit rerun workaround - updated for Streamlit 1.25+."""
     st.rerun()
 
-if "just_saved" not in st.session_state:
-    st.session_state["just_saved"] = False
-
 st.title("Edit Instruction Sessions")
 
-# Handle cancel requests via query parameters
-cancel_session_id = st.query_params.get('cancel_session_id')
-if cancel_session_id:
-    try:
-        cancel_id_int = int(cancel_session_id[0])
-        cancel_session(cancel_id_int)
-        st.query_params.clear()  # Clear query params
-        rerun()
-    except Exception:
-        pass
-
-all_sessions = load_sessions()
-if st.session_state["just_saved"]:
-    all_sessions = load_sessions()
-    st.session_state["just_saved"] = False
+AUTO_REFRESH_SECONDS = 30
+
+# Result of the last batch save, shown once after the rerun
+if "save_message" in st.session_state:
+    st.success(st.session_state.pop("save_message"))
 
 request_columns = [
     'ID', 'Date Requested 1', 'Date Confirmed', 'First', 'Last', 'Campus',
@@ -83,168 +33,272 @@ confirmed_columns = [
 
 canceled_columns = confirmed_columns + ['Canceled Reason']
 
-if not all_sessions:
-    st.warning("No instruction sessions found.")
-else:
-    data = pd.DataFrame([{
-        'ID': s.id,
-        'Date Requested 1': parse_date(s.date_1),
-        'Date Confirmed': parse_date(s.date_of_session),
-        'Campus': s.campus,
-        'Librarian': s.librarian_presenter,
-        'First': s.first,
-        'Last': s.last,
-        'Course Code': s.course_code,
-        'Course_Number': s.course_number,
-        'Type': s.type,
-        'SLOs': [slo.slo for slo in s.slos],
-        'Number of Students': s.number_of_students,
-        'Campus_Room': s.campus_room,
-        'Assessment': s.assessment,
-        'Canceled': getattr(s, 'canceled', False),
-        'Canceled Reason': getattr(s, 'canceled_reason', "")
-    } for s in all_sessions])
-
-    data['Day of Week'] = data['Date Confirmed'].apply(lambda x: x.strftime('%A') if pd.notna(x) else None)
-
-    campus_names = [campus['name'] for campus in campus_list]
-    librarian_names = [lib['name'] for lib in librarian_list]
-
-    campus_options = ["All"] + sorted(campus_names)
-    librarian_options = ["All"] + sorted(librarian_names)
-
-    st.sidebar.header("Filter Options")
-    selected_campus = st.sidebar.selectbox("Select Campus", campus_options)
-    selected_librarian = st.sidebar.selectbox("Select Librarian", librarian_options)
-
-    filtered_data = data.copy()
-    if selected_campus != "All":
-        filtered_data = filtered_data[filtered_data['Campus'] == selected_campus]
-    if selected_librarian != "All":
-        filtered_data = filtered_data[filtered_data['Librarian'] == selected_librarian]
-
-    requests_df = filtered_data[(filtered_data['Date Confirmed'].isna()) & (~filtered_data['Canceled'])]
-    confirmed_df = filtered_data[(filtered_data['Date Confirmed'].notna()) & (~filtered_data['Canceled'])]
-    canceled_df = filtered_data[filtered_data['Canceled']]
-
-    requests_df = requests_df[request_columns]
-    confirmed_df = confirmed_df[confirmed_columns]
-    canceled_df = canceled_df[canceled_columns]
+# Loaded with each editable grid (hidden) so saves can detect concurrent edits
+VERSION_COLUMN = 'Version'
 
-    column_config_requests = {
-        "Campus": st.column_config.SelectboxColumn(label="Campus", options=[""] + sorted(campus_names)),
-        "Librarian": st.column_config.SelectboxColumn(label="Librarian", options=[""] + sorted(librarian_names)),
-    }
+# Grid cells that can be edited in each section
+request_editable = ['Date Confirmed', 'Campus', 'Librarian']
+confirmed_editable = ['Date Confirmed', 'Campus', 'Librarian', 'SLOs', 'Number of Students', 'Campus_Room', 'Assessment']
 
-    column_config_confirmed = {
-        "Campus": st.column_config.SelectboxColumn(label="Campus", options=[""] + sorted(campus_names)),
-        "Librarian": st.column_config.SelectboxColumn(label="Librarian", options=[""] + sorted(librarian_names)),
-    }
+slo_options = [
+    "Develop a research process",
+    "Demonstrate effective search strategies",
+    "Evaluate Information",
+    "Develop an argument supported by evidence",
+    "Use information ethically and legally"
+]
 
-    st.subheader("Instruction Session Requests (Not Yet Confirmed)")
-    for idx, row in requests_df.iterrows():
-        cols = st.columns([6, 1, 1])
+# Active names from the reference tables, already sorted
+campus_names = references.campus_names()
+librarian_names = references.librarian_names()
+
+campus_options = ["All"] + campus_names
+librarian_options = ["All"] + librarian_names
+semester_options = ["All"] + recent_semesters()
+
+st.sidebar.header("Filter Options")
+search_text = st.sidebar.text_input("Search", placeholder="e.g. ENGL 1301 Smith")
+selected_campus = st.sidebar.selectbox("Select Campus", campus_options)
+selected_librarian = st.sidebar.selectbox("Select Librarian", librarian_options)
+# Scoped to the current semester by default; "All" covers every semester not yet archived
+selected_semester = st.sidebar.selectbox(
+    "Select Semester", semester_options, index=semester_options.index(current_semester())
+)
+date_range = st.sidebar.date_input("Date Range", value=[])
+page_size = st.sidebar.selectbox("Rows per Page", [10, 25, 50, 100], index=1)
+auto_refresh = st.sidebar.toggle(
+    "Auto-refresh requests", help=f"Check for new and changed requests every {AUTO_REFRESH_SECONDS} seconds."
+)
+
+# Filters are applied in SQL; only one page of rows per section is loaded
+filters = {
+    'campus': None if selected_campus == "All" else selected_campus,
+    'librarian': None if selected_librarian == "All" else selected_librarian,
+    'semester': None if selected_semester == "All" else selected_semester,
+    'start_date': date_range[0] if len(date_range) > 0 else None,
+    'end_date': date_range[1] if len(date_range) > 1 else None,
+    'query': search_text.strip() or None,
+}
+with profiling.section("Counts"):
+    totals = {status: count_sessions(status, **filters) for status in ('requests', 'confirmed', 'canceled')}
+# Key on the filters so changing them starts back at page 1 with fresh grids
+filter_key = "_".join(str(value) for value in filters.values())
+
+
+def load_page(status, columns):
+    """Render the pager for a section and return that page's rows and a widget key for it."""
+    total = totals[status]
+    pages = max((total - 1) // page_size + 1, 1)
+    page = 1
+    if pages > 1:
+        page = st.number_input(
+            "Page", min_value=1, max_value=pages, value=1,
+            key=f"page_{status}_{page_size}_{filter_key}"
+        )
+    first_row = (page - 1) * page_size
+    st.caption(f"Showing {min(first_row + 1, total)}-{min(first_row + page_size, total)} of {total}")
+
+    page_key = f"{status}_{page}_{page_size}_{filter_key}"
+    loaded_key = f"loaded_{status}"
+    with profiling.section(f"Load {status} page"):
+        page_df = None
+        loaded = st.session_state.get(loaded_key)
+        if loaded and loaded[0] == page_key:
+            # Only the sessions changed since the page was loaded are read again
+            page_df, seq = refresh_page(loaded[1], loaded[2], status, page_size, **filters)
+            if page_df is None:
+                # Rows moved between pages, so pending grid edits would land on the wrong rows
+                st.session_state.pop(f"grid_{page_key}", None)
+        if page_df is None:
+            seq = changes.sync_data_version()
+            page_df = sessions_page(status, page=page, page_size=page_size, **filters)
+        st.session_state[loaded_key] = (page_key, page_df, seq)
+    if page_df.empty:
+        return pd.DataFrame(columns=columns), page_key
+    return page_df[columns], page_key
+
+
+def batch_editor(page_df, editable, column_config, page_key):
+    """One editable grid plus bulk actions, saved in a single transaction and a single rerun."""
+    grid_key = f"grid_{page_key}"
+    grid_df = page_df.copy()
+    grid_df.insert(0, 'Select', False)
+
+    with st.form(f"form_{page_key}"), profiling.section("Render grid"):
+        edited_df = st.data_editor(
+            grid_df,
+            disabled=[column for column in grid_df.columns if column not in editable + ['Select']],
+            column_config=column_config,
+            hide_index=True,
+            key=grid_key
+        )
+
+        st.write("Bulk action for selected rows:")
+        cols = st.columns(3)
         with cols[0]:
-            single_row_df = pd.DataFrame([row])
-            edited_row = st.data_editor(
-                single_row_df,
-                disabled=['ID', 'Date Requested 1', 'First', 'Last', 'Course Code', 'Course_Number', 'Type', 'SLOs'],
-                column_config=column_config_requests,
-                key=f'request_editor_{row["ID"]}'
+            action = st.selectbox(
+                "Action", ["None", "Cancel", "Reassign librarian", "Reassign campus"], key=f"action_{page_key}"
             )
         with cols[1]:
-            if st.button("Save", key=f"save_request_{row['ID']}"):
-                db_session = Session()
-                session_to_update = db_session.query(InstructionSession).filter_by(id=row['ID']).first()
-                if session_to_update:
-                    edited_date = edited_row.iloc[0]['Date Confirmed']
-                    if pd.notna(edited_date):
-                        edited_date = parse_date(edited_date)
-                    else:
-                        edited_date = None
-
-                    session_to_update.date_of_session = edited_date
-
-                    session_to_update.campus = edited_row.iloc[0]['Campus']
-                    session_to_update.librarian_presenter = edited_row.iloc[0]['Librarian']
-                    session_to_update.date_of_session = edited_date
-
-                    db_session.commit()
-                db_session.close()
-                st.session_state["just_saved"] = True
-                rerun()
+            target_librarian = st.selectbox("Librarian", librarian_names, key=f"bulk_lib_{page_key}")
         with cols[2]:
-            if st.button("Cancel", key=f"cancel_request_{row['ID']}"):
-                st.query_params.update(cancel_session_id=[str(row['ID'])])
-                rerun()
-
-    slo_options = [
-        "Develop a research process",
-        "Demonstrate effective search strategies",
-        "Evaluate Information",
-        "Develop an argument supported by evidence",
-        "Use information ethically and legally"
-    ]
+            target_campus = st.selectbox("Campus", campus_names, key=f"bulk_campus_{page_key}")
+        cancel_reason = st.text_input("Cancel reason", CANCELED_REASON, key=f"reason_{page_key}")
+
+        submitted = st.form_submit_button("Save Changes")
+
+    if not submitted:
+        return
+
+    too_many_slos = []
+    if 'SLOs' in editable:
+        too_many_slos = [
+            session_id for session_id, slos in zip(edited_df['ID'], edited_df['SLOs'])
+            if isinstance(slos, (list, tuple)) and len(slos) > 3
+        ]
+    if too_many_slos:
+        st.error(f"Choose at most three SLOs (session IDs {', '.join(str(i) for i in too_many_slos)}).")
+        return
+
+    updates = diff_frames(page_df, edited_df.drop(columns=['Select']), editable)
+    selected_ids = [int(session_id) for session_id in edited_df.loc[edited_df['Select'], 'ID']]
+    canceled_ids = []
+    if action == "Cancel":
+        canceled_ids = selected_ids
+    elif action == "Reassign librarian":
+        for session_id in selected_ids:
+            updates.setdefault(session_id, {})['librarian_presenter'] = target_librarian
+    elif action == "Reassign campus":
+        for session_id in selected_ids:
+            updates.setdefault(session_id, {})['campus'] = target_campus
+
+    versions = dict(zip(page_df['ID'], page_df[VERSION_COLUMN]))
+    try:
+        written = apply_changes(
+            updates, canceled_ids, cancel_reason or CANCELED_REASON,
+            expected_versions={session_id: versions[session_id] for session_id in set(updates) | set(canceled_ids)},
+        )
+    except ConflictError as error:
+        st.error(
+            f"Session(s) {', '.join(map(str, error.session_ids))} were changed by someone else after this page "
+            "was loaded. Nothing was saved; reload the page to see their changes, then make your edits again."
+        )
+        return
+    # Drop the grid's edit state so it is rebuilt from the saved data
+    st.session_state.pop(grid_key, None)
+    st.session_state["save_message"] = f"Saved {written} session(s)." if written else "No changes to save."
+    rerun()
 
-    st.subheader("Confirmed Instruction Sessions")
 
-    if "edit_session_id" not in st.session_state:
-        st.session_state["edit_session_id"] = None
+def requests_section(column_config):
+    """The open requests; with auto-refresh on this section reruns by itself on a timer."""
+    if auto_refresh:
+        # Timed reruns skip main.py, so pick up other processes' writes here
+        changes.sync_data_version()
+        totals['requests'] = count_sessions('requests', **filters)
 
-    for idx, row in confirmed_df.iterrows():
-        expander_label = (
-            f"Session ID {row['ID']} | Date: {row['Date Confirmed']} | "
-            f"{row['First']} {row['Last']} | {row['Course Code']} {row['Course_Number']} | "
-            f"Librarian: {row['Librarian']} | Type: {row['Type']} | Campus: {row['Campus']}"
-        )
+    st.subheader("Instruction Session Requests (Not Yet Confirmed)")
+    requests_df, requests_key = load_page('requests', request_columns + [VERSION_COLUMN])
+    if requests_df.empty:
+        st.write("No open requests.")
+    else:
+        st.caption("Enter a confirmed date to confirm a request. Edits are saved together.")
+        batch_editor(requests_df, request_editable, column_config, requests_key)
+
+
+if filters['query']:
+    # Ranked matches across every status; the sections below are narrowed to them too
+    with profiling.section("Search"):
+        st.subheader("Search Results")
+        results = search_sessions(filters['query'])
+        if results.empty:
+            st.write("No sessions match the search.")
+        else:
+            st.dataframe(results, hide_index=True)
+
+if not any(totals.values()):
+    st.warning("No instruction sessions found.")
+else:
+    column_config_requests = {
+        "Campus": st.column_config.SelectboxColumn(label="Campus", options=[""] + campus_names),
+        "Librarian": st.column_config.SelectboxColumn(label="Librarian", options=[""] + librarian_names),
+        "Date Confirmed": st.column_config.DateColumn(label="Date Confirmed"),
+        VERSION_COLUMN: None,
+    }
+
+    column_config_confirmed = {
+        "Campus": st.column_config.SelectboxColumn(label="Campus", options=[""] + campus_names),
+        "Librarian": st.column_config.SelectboxColumn(label="Librarian", options=[""] + librarian_names),
+        "Date Confirmed": st.column_config.DateColumn(label="Date Confirmed"),
+        "SLOs": st.column_config.MultiselectColumn(label="SLOs", options=slo_options),
+        "Number of Students": st.column_config.NumberColumn(label="Number of Students", min_value=0, step=1),
+        VERSION_COLUMN: None,
+    }
+
+    st.fragment(requests_section, run_every=AUTO_REFRESH_SECONDS if auto_refresh else None)(column_config_requests)
+
+    with st.expander("Scheduling Assistant"), profiling.section("Scheduling assistant"):
+        schedule = load_index()
+
+        double_bookings = schedule.double_bookings()
+        if double_bookings:
+            st.warning(f"{len(double_bookings)} double booking(s) among confirmed sessions.")
+            st.dataframe(
+                pd.DataFrame(double_bookings, columns=['Librarian', 'Date', 'Session ID', 'Overlaps Session ID']),
+                hide_index=True
+            )
 
-        with st.expander(expander_label):
-            if st.button("Edit this Session", key=f"edit_btn_{row['ID']}"):
-                st.session_state["edit_session_id"] = row["ID"]
-
-            if st.session_state["edit_session_id"] == row["ID"]:
-                st.write("### Edit Session Details:")
-
-                new_date = st.date_input("Date Confirmed", parse_date(row['Date Confirmed']), key=f"date_{row['ID']}")
-                new_campus_room = st.text_input("Campus Room", row['Campus_Room'], key=f"room_{row['ID']}")
-                new_num_students = st.number_input("Number of Students", value=row['Number of Students'] or 0, key=f"num_{row['ID']}")
-                new_assessment = st.text_area("Assessment", row['Assessment'], key=f"assess_{row['ID']}")
-
-                current_slos = row['SLOs'] if isinstance(row['SLOs'], list) else []
-                new_slos = st.multiselect(
-                    "Final SLOs addressed in the session",
-                    slo_options,
-                    default=current_slos,
-                    max_selections=3,
-                    key=f"slo_{row['ID']}"
-                )
-
-                if st.button("Save Changes", key=f"save_changes_{row['ID']}"):
-                    db_session = Session()
-                    session_to_update = db_session.query(InstructionSession).filter_by(id=row['ID']).first()
-                    if session_to_update:
-                        session_to_update.date_of_session = parse_date(new_date)
-                        session_to_update.campus_room = new_campus_room
-                        session_to_update.number_of_students = new_num_students
-                        session_to_update.assessment = new_assessment
-
-                        session_to_update.slos.clear()
-                        for slo_text in new_slos:
-                            new_slo = InstructionSessionSLO(slo=slo_text)
-                            session_to_update.slos.append(new_slo)
-
-                        db_session.commit()
-                    db_session.close()
-                    st.success("Session updated.")
-                    st.session_state["just_saved"] = True
-                    st.session_state["edit_session_id"] = None
+        st.write("Who is free?")
+        cols = st.columns(4)
+        with cols[0]:
+            slot_date = st.date_input("Date", key="slot_date")
+        with cols[1]:
+            slot_time = st.time_input("Start time", value=None, key="slot_time")
+        with cols[2]:
+            slot_length = st.number_input("Minutes", min_value=15, value=60, step=15, key="slot_length")
+        with cols[3]:
+            slot_campus = st.selectbox("Campus", [""] + campus_names, key="slot_campus")
+        free_librarians = schedule.available(slot_date, slot_time, slot_length, slot_campus or None)
+        st.write(", ".join(free_librarians) if free_librarians else "Nobody covering that campus is free.")
+
+        if totals['requests']:
+            pending = pending_requests(**filters)
+            proposals = propose_assignments(schedule, pending)
+            proposals_df = pd.DataFrame(proposals).rename(columns={
+                'id': 'ID', 'date': 'Proposed Date', 'librarian': 'Proposed Librarian', 'reason': 'Reason'
+            })
+            st.write("Proposed assignments for open requests:")
+            st.dataframe(proposals_df, hide_index=True)
+            if st.button("Apply Proposals", key=f"apply_proposals_{filter_key}"):
+                updates = {
+                    proposal['id']: {'date_of_session': proposal['date'], 'librarian_presenter': proposal['librarian']}
+                    for proposal in proposals if proposal['date']
+                }
+                versions = {request['id']: request['version'] for request in pending}
+                try:
+                    written = apply_changes(
+                        updates, expected_versions={session_id: versions[session_id] for session_id in updates}
+                    )
+                except ConflictError as error:
+                    st.error(
+                        f"Request(s) {', '.join(map(str, error.session_ids))} were changed by someone else. "
+                        "Nothing was applied; the proposals below have been refreshed."
+                    )
+                else:
+                    st.session_state["save_message"] = f"Confirmed {written} request(s)."
                     rerun()
 
-                if st.button("Cancel Edit", key=f"cancel_edit_{row['ID']}"):
-                    st.session_state["edit_session_id"] = None
+    st.subheader("Confirmed Instruction Sessions")
+    confirmed_df, confirmed_key = load_page('confirmed', confirmed_columns + [VERSION_COLUMN])
+    if confirmed_df.empty:
+        st.write("No confirmed sessions.")
+    else:
+        batch_editor(confirmed_df, confirmed_editable, column_config_confirmed, confirmed_key)
 
     st.subheader("Canceled Instruction Sessions")
+    canceled_df, _ = load_page('canceled', canceled_columns)
     if canceled_df.empty:
         st.write("No canceled sessions.")
     else:
-        st.data_editor(canceled_df, disabled=True, key='canceled_sessions')
+        with profiling.section("Render grid"):
+            st.data_editor(canceled_df, disabled=True, key='canceled_sessions')
@@ -0,0 +1,155 @@
+"""Incrementally maintained summary tables for the dashboard.
+
+Every write path snapshots the sessions it touches before and after the
+change and calls apply_deltas() in the same transaction, which upserts
+the difference into session_summary and slo_summary. ``python summaries.py
+rebuild`` recomputes both tables from the raw rows.
+"""
+import argparse
+from collections import Counter
+from sqlalchemy import select, insert, delete, func, case, false, true
+from database import engine, init_db, InstructionSession, InstructionSessionSLO, SessionSummary, SloSummary
+
+SESSION_KEYS = ['semester', 'month', 'campus', 'librarian', 'type']
+SESSION_VALUES = ['sessions', 'students', 'canceled']
+SLO_KEYS = ['semester', 'month', 'campus', 'librarian', 'slo']
+
+
+def month_key(column):
+    """'YYYY-MM' for a date column in the engine's SQL dialect."""
+    if engine.dialect.name == 'postgresql':
+        return func.to_char(column, 'YYYY-MM')
+    return func.strftime('%Y-%m', column)
+
+
+def snapshot(session):
+    """The fields of an InstructionSession that feed the summaries."""
+    return {
+        'semester': session.semester,
+        'date_of_session': session.date_of_session,
+        'campus': session.campus,
+        'librarian_presenter': session.librarian_presenter,
+        'type': session.type,
+        'canceled': bool(session.canceled),
+        'number_of_students': session.number_of_students,
+        'slos': [slo.slo for slo in session.slos],
+    }
+
+
+def _contributions(row, sign, session_counts, slo_counts):
+    date_of_session = row.get('date_of_session')
+    month = date_of_session.strftime('%Y-%m') if date_of_session else ''
+    semester = row.get('semester') or ''
+    campus, librarian = row.get('campus') or '', row.get('librarian_presenter') or ''
+
+    key = (semester, month, campus, librarian, row.get('type') or '')
+    if row.get('canceled'):
+        session_counts[key + ('canceled',)] += sign
+        return
+    session_counts[key + ('sessions',)] += sign
+    session_counts[key + ('students',)] += sign * (row.get('number_of_students') or 0)
+    for slo in row.get('slos') or []:
+        slo_counts[(semester, month, campus, librarian, slo)] += sign
+
+
+def _upsert(conn, table, keys, values, rows):
+    if engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    stmt = dialect_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=keys,
+        set_={column: table.c[column] + stmt.excluded[column] for column in values},
+    )
+    conn.execute(stmt, rows)
+
+
+def apply_deltas(conn, before=(), after=()):
+    """Move the summaries from the 'before' snapshots to the 'after' snapshots.
+
+    conn is the Connection or ORM Session of the write's own transaction.
+    """
+    session_counts, slo_counts = Counter(), Counter()
+    for row in before:
+        _contributions(row, -1, session_counts, slo_counts)
+    for row in after:
+        _contributions(row, 1, session_counts, slo_counts)
+
+    session_rows = {}
+    for (*key, column), delta in session_counts.items():
+        if delta:
+            row = session_rows.setdefault(tuple(key), dict(zip(SESSION_KEYS, key), sessions=0, students=0, canceled=0))
+            row[column] += delta
+    if session_rows:
+        _upsert(conn, SessionSummary.__table__, SESSION_KEYS, SESSION_VALUES, list(session_rows.values()))
+
+    slo_rows = [dict(zip(SLO_KEYS, key), sessions=delta) for key, delta in slo_counts.items() if delta]
+    if slo_rows:
+        _upsert(conn, SloSummary.__table__, SLO_KEYS, ['sessions'], slo_rows)
+
+
+def _rollups():
+    """INSERT-ready SELECTs rolling instruction_sessions up into each summary table."""
+    semester = func.coalesce(InstructionSession.semester, '')
+    month = func.coalesce(month_key(InstructionSession.date_of_session), '')
+    campus = func.coalesce(InstructionSession.campus, '')
+    librarian = func.coalesce(InstructionSession.librarian_presenter, '')
+    session_type = func.coalesce(InstructionSession.type, '')
+    active = InstructionSession.canceled == false()
+
+    session_rollup = select(
+        semester, month, campus, librarian, session_type,
+        func.sum(case((active, 1), else_=0)),
+        func.sum(case((active, func.coalesce(InstructionSession.number_of_students, 0)), else_=0)),
+        func.sum(case((InstructionSession.canceled == true(), 1), else_=0)),
+    ).group_by(semester, month, campus, librarian, session_type)
+
+    slo_rollup = (
+        select(semester, month, campus, librarian, InstructionSessionSLO.slo, func.count())
+        .join(InstructionSessionSLO, InstructionSessionSLO.session_id == InstructionSession.id)
+        .where(active, InstructionSessionSLO.slo.is_not(None))
+        .group_by(semester, month, campus, librarian, InstructionSessionSLO.slo)
+    )
+    return session_rollup, slo_rollup
+
+
+def rebuild(conn):
+    """Recompute both summary tables from instruction_sessions with two INSERT ... SELECTs.
+
+    Sessions moved to the archive database (archive.py) are added back in,
+    so the rollups keep covering every semester.
+    """
+    import archive
+
+    session_rollup, slo_rollup = _rollups()
+    conn.execute(delete(SessionSummary.__table__))
+    conn.execute(delete(SloSummary.__table__))
+    conn.execute(insert(SessionSummary.__table__).from_select(SESSION_KEYS + SESSION_VALUES, session_rollup))
+    conn.execute(insert(SloSummary.__table__).from_select(SLO_KEYS + ['sessions'], slo_rollup))
+
+    archived = archive.archive_engine()
+    if archived is None:
+        return
+    with archived.connect() as archive_conn:
+        session_rows = [dict(zip(SESSION_KEYS + SESSION_VALUES, row)) for row in archive_conn.execute(session_rollup)]
+        slo_rows = [dict(zip(SLO_KEYS + ['sessions'], row)) for row in archive_conn.execute(slo_rollup)]
+    if session_rows:
+        _upsert(conn, SessionSummary.__table__, SESSION_KEYS, SESSION_VALUES, session_rows)
+    if slo_rows:
+        _upsert(conn, SloSummary.__table__, SLO_KEYS, ['sessions'], slo_rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the dashboard summary tables.")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args()
+    init_db()
+
+    with engine.begin() as conn:
+        rebuild(conn)
+    print("Summary tables rebuilt.")
+
+
+if __name__ == "__main__":
+    main()